@@ -4,6 +4,7 @@ Audio Generation Server - Text to Speech, Music Generation, and Audio Processing
 """
 
 import os
+import sys
 import json
 import asyncio
 import subprocess
@@ -11,17 +12,53 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import wave
 import struct
 import math
+import random
+import numpy as np
+import soundfile as sf
 
 from fastapi import FastAPI, HTTPException, File, UploadFile, BackgroundTasks
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 import uvicorn
 
 app = FastAPI(title="Audio Generation Server", version="1.0.0")
 
+@app.on_event("startup")
+async def start_music_pool():
+    # Melody synthesis is CPU-bound; run it in separate processes
+    app.state.music_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+@app.on_event("shutdown")
+async def stop_music_pool():
+    # cancel_futures is 3.9+; on 3.8 queued jobs still run out before the workers exit
+    if sys.version_info >= (3, 9):
+        app.state.music_pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        app.state.music_pool.shutdown(wait=False)
+
+# Static payload for the root handler, built once at import
+API_INFO = {
+    "service": "Audio Generation Server",
+    "version": "1.0.0",
+    "endpoints": {
+        "/api/tts": "Text to speech generation",
+        "/api/voices": "List available TTS voices",
+        "/api/generate_music": "Generate music from text prompt",
+        "/api/process_audio": "Apply effects to audio files",
+        "/api/mix_audio": "Mix multiple audio tracks",
+        "/docs": "Interactive API documentation"
+    },
+    "supported_effects": [
+        "reverb", "echo", "pitch_shift", "time_stretch", "noise_reduction"
+    ],
+    "note": "Requires ffmpeg installed on system"
+}
+
 class TextToSpeechRequest(BaseModel):
     text: str
     voice: str = "default"
@@ -47,8 +84,20 @@ class AudioMixRequest(BaseModel):
     volumes: Optional[List[float]] = None
     output_format: str = "mp3"
 
+SAMPLE_RATE = 44100
+MELODY_NOTES = (440, 494, 523, 587, 659, 698, 784)  # A major scale
+
+# ffmpeg filter arguments for each supported effect
+EFFECT_BUILDERS = {
+    "reverb": lambda p: ['-af', f'aecho=0.8:0.9:{p.get("amount", 0.5)*1000}:0.3'],
+    "echo": lambda p: ['-af', f'aecho=1.0:1.0:{p.get("delay", 0.5)*1000}:{p.get("decay", 0.5)}'],
+    "pitch_shift": lambda p: ['-af', f'asetrate=44100*{2 ** (p.get("semitones", 0) / 12)},aresample=44100'],
+    "time_stretch": lambda p: ['-filter:a', f'atempo={p.get("speed", 1.0)}'],
+    "noise_reduction": lambda p: ['-af', 'afftdn=nf=-20:nr=10'],
+}
+
 # Audio utilities
-def generate_sine_wave(frequency: float, duration: float, sample_rate: int = 44100) -> bytes:
+def generate_sine_wave(frequency: float, duration: float, sample_rate: int = SAMPLE_RATE) -> bytes:
     """Generate a simple sine wave for testing"""
     samples = []
     for i in range(int(sample_rate * duration)):
@@ -56,6 +105,69 @@ def generate_sine_wave(frequency: float, duration: float, sample_rate: int = 441
         samples.append(struct.pack('<h', int(sample)))
     return b''.join(samples)
 
+def generate_melody(duration: float, bpm: int) -> bytes:
+    """Render a random procedural melody as raw 16-bit mono PCM"""
+    beat_duration = 60.0 / bpm
+    note_duration = beat_duration * 0.8
+    silence_samples = int(SAMPLE_RATE * beat_duration * 0.2)
+    
+    # Draw the whole melody up front from the scale
+    n_notes = math.ceil(duration / beat_duration)
+    chosen = random.choices(MELODY_NOTES, k=n_notes)
+    
+    # Each distinct note is rendered once and reused for every beat
+    note_cache = {note: generate_sine_wave(note, note_duration) for note in set(chosen)}
+    
+    # One shared silence buffer between notes; join all chunks once
+    silence = b'\x00\x00' * silence_samples
+    chunks = []
+    for note in chosen:
+        chunks.append(note_cache[note])
+        chunks.append(silence)
+    return b''.join(chunks)
+
+def mix_numpy(tracks: List[np.ndarray], volumes: List[float]) -> np.ndarray:
+    """Mix (frames, channels) float tracks, averaging like ffmpeg's amix"""
+    length = max(track.shape[0] for track in tracks)
+    stack = np.zeros((len(tracks), length, tracks[0].shape[1]), dtype=np.float32)
+    for i, track in enumerate(tracks):
+        stack[i, :track.shape[0]] = track
+    
+    weights = np.asarray(volumes, dtype=np.float32) / len(tracks)
+    mix = np.einsum('itc,i->tc', stack, weights)
+    return np.clip(mix, -1.0, 1.0)
+
+def mix_files_numpy(paths: List[str], volumes: List[float], output_file: str) -> bool:
+    """Mix audio files without ffmpeg; returns False if libsndfile can't decode them or they don't line up"""
+    tracks = []
+    sample_rate = None
+    try:
+        for path in paths:
+            data, rate = sf.read(path, dtype='float32', always_2d=True)
+            if tracks and (rate != sample_rate or data.shape[1] != tracks[0].shape[1]):
+                return False
+            sample_rate = rate
+            tracks.append(data)
+        
+        sf.write(output_file, mix_numpy(tracks, volumes), sample_rate)
+    except (RuntimeError, getattr(sf, 'LibsndfileError', RuntimeError)):
+        # Extension looked supported but the contents aren't; ffmpeg gets a go instead
+        return False
+    return True
+
+async def run_command(cmd: List[str]) -> subprocess.CompletedProcess:
+    """Run an external command without blocking the event loop"""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    return subprocess.CompletedProcess(
+        cmd, proc.returncode,
+        stdout.decode(errors='replace'), stderr.decode(errors='replace')
+    )
+
 def create_wav_file(audio_data: bytes, sample_rate: int = 44100) -> str:
     """Create a WAV file from raw audio data"""
     temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
@@ -91,15 +203,14 @@ async def text_to_speech(request: TextToSpeechRequest):
         cmd.append(request.text)
         
         # Execute the command
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await run_command(cmd)
         
         if result.returncode != 0:
             raise HTTPException(status_code=500, detail=f"TTS failed: {result.stderr}")
         
         # Convert to MP3 for smaller file size
         mp3_file = output_file.replace('.aiff', '.mp3')
-        subprocess.run(['ffmpeg', '-i', output_file, '-acodec', 'mp3', mp3_file, '-y'], 
-                      capture_output=True)
+        await run_command(['ffmpeg', '-i', output_file, '-acodec', 'mp3', mp3_file, '-y'])
         
         # Clean up AIFF file
         os.unlink(output_file)
@@ -107,6 +218,7 @@ async def text_to_speech(request: TextToSpeechRequest):
         return FileResponse(
             mp3_file,
             media_type="audio/mpeg",
+            background=BackgroundTask(os.unlink, mp3_file),
             filename=f"speech_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
         )
         
@@ -118,7 +230,7 @@ async def list_voices():
     """List available TTS voices"""
     try:
         # Get macOS voices
-        result = subprocess.run(['say', '-v', '?'], capture_output=True, text=True)
+        result = await run_command(['say', '-v', '?'])
         voices = []
         
         for line in result.stdout.split('\n'):
@@ -144,43 +256,25 @@ async def generate_music(request: MusicGenerationRequest):
         # For now, generate a simple procedural melody
         # In production, integrate with models like MusicGen, AudioCraft, etc.
         
-        duration = request.duration
-        bpm = request.bpm or 120
-        
-        # Generate a simple melody pattern
-        notes = [440, 494, 523, 587, 659, 698, 784]  # A major scale
-        beat_duration = 60.0 / bpm
-        
-        audio_data = b''
-        current_time = 0
-        
-        while current_time < duration:
-            # Pick a random note from the scale
-            import random
-            note = random.choice(notes)
-            
-            # Generate note
-            note_audio = generate_sine_wave(note, beat_duration * 0.8)
-            
-            # Add silence between notes
-            silence = b'\x00\x00' * int(44100 * beat_duration * 0.2)
-            
-            audio_data += note_audio + silence
-            current_time += beat_duration
+        # Render the melody in a worker process so the event loop stays free
+        loop = asyncio.get_running_loop()
+        audio_data = await loop.run_in_executor(
+            app.state.music_pool, generate_melody, request.duration, request.bpm or 120
+        )
         
         # Create WAV file
         wav_file = create_wav_file(audio_data)
         
         # Convert to MP3
         mp3_file = wav_file.replace('.wav', '.mp3')
-        subprocess.run(['ffmpeg', '-i', wav_file, '-acodec', 'mp3', mp3_file, '-y'],
-                      capture_output=True)
+        await run_command(['ffmpeg', '-i', wav_file, '-acodec', 'mp3', mp3_file, '-y'])
         
         os.unlink(wav_file)
         
         return FileResponse(
             mp3_file,
             media_type="audio/mpeg",
+            background=BackgroundTask(os.unlink, mp3_file),
             filename=f"music_{request.style}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
         )
         
@@ -210,34 +304,14 @@ async def process_audio(
         # Build ffmpeg command based on effect
         cmd = ['ffmpeg', '-i', temp_input.name]
         
-        if effect == "reverb":
-            reverb_amount = params.get('amount', 0.5)
-            cmd.extend(['-af', f'aecho=0.8:0.9:{reverb_amount*1000}:0.3'])
-        
-        elif effect == "echo":
-            delay = params.get('delay', 0.5)
-            decay = params.get('decay', 0.5)
-            cmd.extend(['-af', f'aecho=1.0:1.0:{delay*1000}:{decay}'])
-        
-        elif effect == "pitch_shift":
-            semitones = params.get('semitones', 0)
-            pitch_factor = 2 ** (semitones / 12)
-            cmd.extend(['-af', f'asetrate=44100*{pitch_factor},aresample=44100'])
-        
-        elif effect == "time_stretch":
-            speed = params.get('speed', 1.0)
-            cmd.extend(['-filter:a', f'atempo={speed}'])
-        
-        elif effect == "noise_reduction":
-            cmd.extend(['-af', 'afftdn=nf=-20:nr=10'])
-        
-        else:
+        if effect not in EFFECT_BUILDERS:
             raise HTTPException(status_code=400, detail=f"Unknown effect: {effect}")
+        cmd.extend(EFFECT_BUILDERS[effect](params))
         
         cmd.extend([output_file, '-y'])
         
         # Execute ffmpeg
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await run_command(cmd)
         
         if result.returncode != 0:
             raise HTTPException(status_code=500, detail=f"Processing failed: {result.stderr}")
@@ -248,6 +322,7 @@ async def process_audio(
         return FileResponse(
             output_file,
             media_type="audio/mpeg",
+            background=BackgroundTask(os.unlink, output_file),
             filename=f"processed_{effect}_{Path(file.filename).stem}.mp3"
         )
         
@@ -259,6 +334,27 @@ async def mix_audio(request: AudioMixRequest):
     """Mix multiple audio tracks together"""
     try:
         output_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{request.output_format}').name
+        volumes = [
+            request.volumes[i] if request.volumes and i < len(request.volumes) else 1.0
+            for i in range(len(request.tracks))
+        ]
+        
+        # Mix in-process when libsndfile can read every track and write the output
+        formats = sf.available_formats()
+        if request.output_format.upper() in formats and all(
+            Path(track).suffix[1:].upper() in formats for track in request.tracks
+        ):
+            loop = asyncio.get_running_loop()
+            mixed = await loop.run_in_executor(
+                None, mix_files_numpy, request.tracks, volumes, output_file
+            )
+            if mixed:
+                return FileResponse(
+                    output_file,
+                    media_type=f"audio/{request.output_format}",
+                    background=BackgroundTask(os.unlink, output_file),
+                    filename=f"mixed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{request.output_format}"
+                )
         
         # Build ffmpeg command for mixing
         cmd = ['ffmpeg']
@@ -269,8 +365,7 @@ async def mix_audio(request: AudioMixRequest):
         
         # Build filter complex for mixing
         filter_parts = []
-        for i, track in enumerate(request.tracks):
-            volume = request.volumes[i] if request.volumes and i < len(request.volumes) else 1.0
+        for i, volume in enumerate(volumes):
             filter_parts.append(f'[{i}:a]volume={volume}[a{i}]')
         
         # Mix all tracks
@@ -281,7 +376,7 @@ async def mix_audio(request: AudioMixRequest):
         cmd.extend(['-map', '[out]', output_file, '-y'])
         
         # Execute
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await run_command(cmd)
         
         if result.returncode != 0:
             raise HTTPException(status_code=500, detail=f"Mixing failed: {result.stderr}")
@@ -289,6 +384,7 @@ async def mix_audio(request: AudioMixRequest):
         return FileResponse(
             output_file,
             media_type=f"audio/{request.output_format}",
+            background=BackgroundTask(os.unlink, output_file),
             filename=f"mixed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{request.output_format}"
         )
         
@@ -298,22 +394,7 @@ async def mix_audio(request: AudioMixRequest):
 @app.get("/")
 async def root():
     """API documentation"""
-    return {
-        "service": "Audio Generation Server",
-        "version": "1.0.0",
-        "endpoints": {
-            "/api/tts": "Text to speech generation",
-            "/api/voices": "List available TTS voices",
-            "/api/generate_music": "Generate music from text prompt",
-            "/api/process_audio": "Apply effects to audio files",
-            "/api/mix_audio": "Mix multiple audio tracks",
-            "/docs": "Interactive API documentation"
-        },
-        "supported_effects": [
-            "reverb", "echo", "pitch_shift", "time_stretch", "noise_reduction"
-        ],
-        "note": "Requires ffmpeg installed on system"
-    }
+    return API_INFO
 
 if __name__ == "__main__":
     print("🎵 Starting Audio Generation Server on http://localhost:8001")
@@ -4,13 +4,16 @@ Local LLM Server - Integration with Ollama, LM Studio, and local language models
 """
 
 import os
+import io
 import json
 import asyncio
 import aiohttp
+import orjson
 import subprocess
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from collections import OrderedDict
 
 from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.responses import StreamingResponse
@@ -27,6 +30,81 @@ LLM_SERVICES = {
     "llamacpp": "http://localhost:8080"
 }
 
+HEADERS = {"Content-Type": "application/json"}
+
+# Most recent Ollama context per (model, conversation_id), least recently used evicted first
+MAX_CONVERSATIONS = 256
+CONVERSATION_CONTEXTS = OrderedDict()
+
+# Static payloads served as-is, built once at import
+PROMPT_TEMPLATES = {
+    "templates": {
+        "code_review": """Review the following code and provide feedback on:
+1. Code quality and best practices
+2. Potential bugs or issues
+3. Performance improvements
+4. Security concerns
+
+Code:
+{code}""",
+        
+        "explain_concept": """Explain {concept} in simple terms. Include:
+1. A basic definition
+2. Why it's important
+3. A real-world example
+4. Common misconceptions""",
+        
+        "creative_writing": """Write a {genre} story about {topic}. 
+Requirements:
+- Length: {word_count} words
+- Tone: {tone}
+- Include: {elements}""",
+        
+        "data_analysis": """Analyze the following data and provide:
+1. Key insights
+2. Patterns or trends
+3. Anomalies
+4. Recommendations
+
+Data:
+{data}""",
+        
+        "task_breakdown": """Break down the following task into actionable steps:
+Task: {task}
+
+Provide:
+1. Step-by-step instructions
+2. Time estimates
+3. Required resources
+4. Potential challenges"""
+    }
+}
+
+API_INFO = {
+    "service": "Local LLM Server",
+    "version": "1.0.0",
+    "endpoints": {
+        "/api/chat": "Chat with local LLM",
+        "/api/completion": "Text completion",
+        "/api/embeddings": "Generate embeddings",
+        "/api/models/manage": "Manage models (list, pull, delete)",
+        "/api/rag": "RAG queries with context",
+        "/api/function_call": "Function calling simulation",
+        "/ws/chat": "WebSocket streaming chat",
+        "/api/services/status": "Check LLM service status",
+        "/api/prompts/templates": "Get prompt templates",
+        "/docs": "Interactive API documentation"
+    },
+    "supported_services": list(LLM_SERVICES.keys()),
+    "setup_instructions": {
+        "ollama": "brew install ollama && ollama serve",
+        "lm_studio": "Download from lmstudio.ai",
+        "text_generation_webui": "github.com/oobabooga/text-generation-webui",
+        "llamacpp": "github.com/ggerganov/llama.cpp"
+    },
+    "note": "At least one LLM service must be running"
+}
+
 class ChatRequest(BaseModel):
     model: str = "llama3.1:8b"  # Updated to your actual model
     messages: List[Dict[str, str]]
@@ -42,6 +120,8 @@ class CompletionRequest(BaseModel):
     max_tokens: int = 1000
     top_p: float = 0.9
     stream: bool = False
+    context: Optional[List[int]] = None  # Ollama context from a previous completion
+    conversation_id: Optional[str] = None  # Reuse context kept by the server
 
 class EmbeddingRequest(BaseModel):
     model: str = "llama3.1:8b"  # Updated to your actual model
@@ -130,28 +210,46 @@ async def chat_completion(request: ChatRequest):
 async def text_completion(request: CompletionRequest):
     """Generate text completion"""
     try:
+        # Thread the previous KV context back so Ollama can skip the shared prefix
+        cache_key = (request.model, request.conversation_id)
+        context = request.context
+        if context is None and request.conversation_id:
+            context = CONVERSATION_CONTEXTS.get(cache_key)
+        
+        ollama_request = {
+            "model": request.model,
+            "prompt": request.prompt,
+            "stream": False,
+            "options": {
+                "temperature": request.temperature,
+                "top_p": request.top_p,
+                "num_predict": request.max_tokens
+            }
+        }
+        if context:
+            ollama_request["context"] = context
+        
         async with aiohttp.ClientSession() as session:
             # Try Ollama generate endpoint
             async with session.post(
                 f"{LLM_SERVICES['ollama']}/api/generate",
-                json={
-                    "model": request.model,
-                    "prompt": request.prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": request.temperature,
-                        "top_p": request.top_p,
-                        "num_predict": request.max_tokens
-                    }
-                }
+                json=ollama_request
             ) as response:
                 if response.status == 200:
                     result = await response.json()
+                    new_context = result.get("context", [])
+                    
+                    if request.conversation_id and new_context:
+                        CONVERSATION_CONTEXTS[cache_key] = new_context
+                        CONVERSATION_CONTEXTS.move_to_end(cache_key)
+                        while len(CONVERSATION_CONTEXTS) > MAX_CONVERSATIONS:
+                            CONVERSATION_CONTEXTS.popitem(last=False)
+                    
                     return {
                         "model": request.model,
                         "text": result.get("response", ""),
                         "done": result.get("done", True),
-                        "context": result.get("context", [])
+                        "context": new_context
                     }
     
     except Exception as e:
@@ -231,23 +329,20 @@ async def manage_models(request: ModelManagementRequest):
 async def rag_query(request: RAGRequest):
     """Retrieval-Augmented Generation query"""
     try:
-        # Combine context into prompt
-        context_text = "\n\n".join(request.context)
-        
-        augmented_prompt = f"""Based on the following context, please answer the question.
-
-Context:
-{context_text}
-
-Question: {request.query}
-
-Answer:"""
+        # Build the prompt in a single buffer so the context is only copied once
+        buf = io.StringIO()
+        buf.write("Based on the following context, please answer the question.\n\nContext:\n")
+        for chunk in request.context:
+            buf.write(chunk)
+            buf.write("\n\n")
+        buf.write(f"Question: {request.query}\n\nAnswer:")
+        augmented_prompt = buf.getvalue()
         
         # Use chat completion with context
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 f"{LLM_SERVICES['ollama']}/api/generate",
-                json={
+                data=orjson.dumps({
                     "model": request.model,
                     "prompt": augmented_prompt,
                     "stream": False,
@@ -255,7 +350,8 @@ Answer:"""
                         "temperature": 0.3,  # Lower temperature for factual responses
                         "num_predict": request.max_tokens
                     }
-                }
+                }),
+                headers=HEADERS
             ) as response:
                 if response.status == 200:
                     result = await response.json()
@@ -427,76 +523,12 @@ async def check_llm_services():
 @app.get("/api/prompts/templates")
 async def get_prompt_templates():
     """Get useful prompt templates"""
-    return {
-        "templates": {
-            "code_review": """Review the following code and provide feedback on:
-1. Code quality and best practices
-2. Potential bugs or issues
-3. Performance improvements
-4. Security concerns
-
-Code:
-{code}""",
-            
-            "explain_concept": """Explain {concept} in simple terms. Include:
-1. A basic definition
-2. Why it's important
-3. A real-world example
-4. Common misconceptions""",
-            
-            "creative_writing": """Write a {genre} story about {topic}. 
-Requirements:
-- Length: {word_count} words
-- Tone: {tone}
-- Include: {elements}""",
-            
-            "data_analysis": """Analyze the following data and provide:
-1. Key insights
-2. Patterns or trends
-3. Anomalies
-4. Recommendations
-
-Data:
-{data}""",
-            
-            "task_breakdown": """Break down the following task into actionable steps:
-Task: {task}
-
-Provide:
-1. Step-by-step instructions
-2. Time estimates
-3. Required resources
-4. Potential challenges"""
-        }
-    }
+    return PROMPT_TEMPLATES
 
 @app.get("/")
 async def root():
     """API documentation"""
-    return {
-        "service": "Local LLM Server",
-        "version": "1.0.0",
-        "endpoints": {
-            "/api/chat": "Chat with local LLM",
-            "/api/completion": "Text completion",
-            "/api/embeddings": "Generate embeddings",
-            "/api/models/manage": "Manage models (list, pull, delete)",
-            "/api/rag": "RAG queries with context",
-            "/api/function_call": "Function calling simulation",
-            "/ws/chat": "WebSocket streaming chat",
-            "/api/services/status": "Check LLM service status",
-            "/api/prompts/templates": "Get prompt templates",
-            "/docs": "Interactive API documentation"
-        },
-        "supported_services": list(LLM_SERVICES.keys()),
-        "setup_instructions": {
-            "ollama": "brew install ollama && ollama serve",
-            "lm_studio": "Download from lmstudio.ai",
-            "text_generation_webui": "github.com/oobabooga/text-generation-webui",
-            "llamacpp": "github.com/ggerganov/llama.cpp"
-        },
-        "note": "At least one LLM service must be running"
-    }
+    return API_INFO
 
 if __name__ == "__main__":
     print("🤖 Starting Local LLM Server on http://localhost:8005")
@@ -4,23 +4,107 @@ Mac Automation Server - System management, file organization, and automation wor
 """
 
 import os
+import sys
+import errno
+import ctypes
 import json
+import time
+import asyncio
+import uuid
 import subprocess
 import psutil
 import shutil
+import shlex
 import sqlite3
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable
 from datetime import datetime, timedelta
 import plistlib
 import hashlib
+import heapq
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Talk to the pasteboard in-process when PyObjC is available, else shell out to pbcopy/pbpaste
+try:
+    from AppKit import NSPasteboard, NSPasteboardTypeString
+except ImportError:
+    NSPasteboard = None
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
-app = FastAPI(title="Mac Automation Server", version="1.0.0")
+app = FastAPI(title="Mac Automation Server", version="1.0.0", default_response_class=ORJSONResponse)
+
+# APFS clonefile(2) shares data blocks instead of copying them
+if sys.platform == "darwin":
+    clonefile = ctypes.CDLL("/usr/lib/libSystem.dylib", use_errno=True).clonefile
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    clonefile.restype = ctypes.c_int
+else:
+    clonefile = None
+
+# System facts that don't change while the machine is up, queried once at import
+HOSTNAME = os.uname().nodename
+CPU_COUNT = psutil.cpu_count()
+_cpu_freq = psutil.cpu_freq()  # macOS reports the nominal frequency
+CPU_FREQ = _cpu_freq._asdict() if _cpu_freq else None
+MEMORY_TOTAL = psutil.virtual_memory().total
+BOOT_TIME = datetime.fromtimestamp(psutil.boot_time()).isoformat()
+
+# Background automation jobs and app bundle metadata are kept in SQLite
+CACHE_DIR = Path("~/Library/Caches/mac_automation").expanduser()
+JOBS_DB = CACHE_DIR / "jobs.db"
+APPS_DB = CACHE_DIR / "apps.db"
+
+@app.on_event("startup")
+async def init_databases():
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(APPS_DB) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS apps (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                bundle_id TEXT,
+                version TEXT,
+                size INTEGER
+            )
+        """)
+    with sqlite3.connect(JOBS_DB) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                action TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created TEXT NOT NULL,
+                finished TEXT,
+                result TEXT,
+                error TEXT
+            )
+        """)
+
+# Latest system-wide CPU percent, refreshed by a background sampler
+CPU_SAMPLE_INTERVAL = 2.0
+PROCESS_SAMPLE_INTERVAL = 0.1  # Window for per-process CPU sampling
+cpu_cache = {"timestamp": 0.0, "percent": 0.0}
+
+async def sample_cpu_percent():
+    """Keep cpu_cache fresh without blocking request handlers"""
+    psutil.cpu_percent(interval=None)  # Prime the counter; first reading is meaningless
+    while True:
+        await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+        cpu_cache["percent"] = psutil.cpu_percent(interval=None)
+        cpu_cache["timestamp"] = time.time()
+
+@app.on_event("startup")
+async def start_cpu_sampler():
+    app.state.cpu_sampler = asyncio.create_task(sample_cpu_percent())
+
+@app.on_event("shutdown")
+async def stop_cpu_sampler():
+    app.state.cpu_sampler.cancel()
 
 class SystemInfoRequest(BaseModel):
     include_processes: bool = False
@@ -31,6 +115,7 @@ class FileOrganizeRequest(BaseModel):
     source_directory: str
     rules: Dict[str, List[str]]  # extension -> folder mapping
     dry_run: bool = True
+    stream: bool = False  # Emit NDJSON records as files are processed
 
 class AutomationRequest(BaseModel):
     action: str  # cleanup_downloads, organize_desktop, backup_configs, optimize_storage
@@ -50,6 +135,138 @@ class ClipboardRequest(BaseModel):
     action: str  # get, set, history, clear
     content: Optional[str] = None
 
+# Hashing is I/O-bound, so oversubscribe the cores to overlap disk reads
+HASH_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+
+def hash_file_head(path, length: int = 64 * 1024) -> bytes:
+    """BLAKE2b digest of the first `length` bytes of a file"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return hashlib.blake2b(os.read(fd, length), digest_size=16).digest()
+    finally:
+        os.close(fd)
+
+def hash_file_full(path, chunk_size: int = 1024 * 1024) -> bytes:
+    """BLAKE2b digest of a file's entire contents"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.digest()
+
+def scan_files(root):
+    """Yield a DirEntry for every regular file under root, without following symlinks"""
+    pending = [root]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def bucket_files_by_size(root: Path, min_size: int) -> Dict[int, List[Path]]:
+    """Group files larger than min_size under root by their size"""
+    size_buckets = defaultdict(list)
+    for entry in scan_files(root):
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        if size > min_size:
+            size_buckets[size].append(Path(entry.path))
+    return size_buckets
+
+async def hash_files(paths: List[Path], hash_func) -> Dict[Path, bytes]:
+    """Hash files concurrently on HASH_POOL; unreadable files are left out"""
+    loop = asyncio.get_running_loop()
+    digests = await asyncio.gather(
+        *(loop.run_in_executor(HASH_POOL, hash_func, path) for path in paths),
+        return_exceptions=True
+    )
+    return {
+        path: digest for path, digest in zip(paths, digests)
+        if not isinstance(digest, BaseException)
+    }
+
+async def iter_duplicate_files(root: Path, min_size: int = 1024 * 1024):
+    """Yield duplicate records for files under root as each group is confirmed"""
+    loop = asyncio.get_running_loop()
+    
+    # Files of different sizes can't be duplicates, so bucket by size first
+    size_buckets = await loop.run_in_executor(HASH_POOL, bucket_files_by_size, root, min_size)
+    sizes = {path: size for size, paths in size_buckets.items() if len(paths) > 1 for path in paths}
+    
+    # Cheap head hash to split the buckets, full hash to confirm
+    heads = await hash_files(list(sizes), hash_file_head)
+    groups = defaultdict(list)
+    for path, head in heads.items():
+        groups[(sizes[path], head)].append(path)
+    
+    for (size, _), candidates in groups.items():
+        if len(candidates) < 2:
+            continue
+        originals = {}
+        full_hashes = await hash_files(candidates, hash_file_full)
+        for path, digest in full_hashes.items():
+            if digest in originals:
+                yield {
+                    "original": str(originals[digest]),
+                    "duplicate": str(path),
+                    "size": size
+                }
+            else:
+                originals[digest] = path
+
+async def find_duplicate_files(root: Path, min_size: int = 1024 * 1024) -> List[Dict[str, Any]]:
+    """Find files under root with identical contents, keeping the first seen as original"""
+    return [duplicate async for duplicate in iter_duplicate_files(root, min_size)]
+
+async def stream_duplicates(root: Path):
+    """NDJSON lines for each duplicate, followed by a summary line"""
+    found = 0
+    savings = 0
+    async for duplicate in iter_duplicate_files(root):
+        found += 1
+        savings += duplicate["size"]
+        yield json.dumps(duplicate) + "\n"
+    yield json.dumps({
+        "action": "optimize_storage",
+        "duplicates_found": found,
+        "potential_savings": savings
+    }) + "\n"
+
+# Process objects kept between polls so their CPU counters carry over
+PROCESS_CACHE: Dict[int, psutil.Process] = {}
+
+def current_processes():
+    """Return (all live processes, those not seen on a previous call)"""
+    live = {}
+    new_procs = []
+    for pid in psutil.pids():
+        proc = PROCESS_CACHE.get(pid)
+        # is_running() also compares create time, catching reused PIDs
+        if proc is not None and proc.is_running():
+            live[pid] = proc
+            continue
+        try:
+            proc = psutil.Process(pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        live[pid] = proc
+        new_procs.append(proc)
+    
+    # Dropping PIDs that are gone keeps the cache from growing
+    PROCESS_CACHE.clear()
+    PROCESS_CACHE.update(live)
+    return list(live.values()), new_procs
+
 @app.get("/api/system/info")
 async def get_system_info(
     include_processes: bool = False,
@@ -58,21 +275,22 @@ async def get_system_info(
 ):
     """Get comprehensive system information"""
     try:
+        memory = psutil.virtual_memory()
         info = {
             "platform": "macOS",
-            "hostname": os.uname().nodename,
+            "hostname": HOSTNAME,
             "cpu": {
-                "count": psutil.cpu_count(),
-                "percent": psutil.cpu_percent(interval=1),
-                "freq": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
+                "count": CPU_COUNT,
+                "percent": cpu_cache["percent"],
+                "freq": CPU_FREQ
             },
             "memory": {
-                "total": psutil.virtual_memory().total,
-                "available": psutil.virtual_memory().available,
-                "percent": psutil.virtual_memory().percent,
-                "used": psutil.virtual_memory().used
+                "total": MEMORY_TOTAL,
+                "available": memory.available,
+                "percent": memory.percent,
+                "used": memory.used
             },
-            "boot_time": datetime.fromtimestamp(psutil.boot_time()).isoformat()
+            "boot_time": BOOT_TIME
         }
         
         if include_disks:
@@ -94,15 +312,34 @@ async def get_system_info(
         
         if include_processes:
             info["top_processes"] = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+            procs, new_procs = current_processes()
+            
+            # A process's first cpu_percent() call only primes its counter, so prime
+            # the ones we haven't seen before, wait once, then sample. Cached
+            # processes report usage since the previous poll.
+            for proc in new_procs:
                 try:
-                    pinfo = proc.info
+                    proc.cpu_percent()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            if new_procs:
+                await asyncio.sleep(PROCESS_SAMPLE_INTERVAL)
+            
+            for proc in procs:
+                try:
+                    # Batch the per-process kernel queries into one snapshot
+                    with proc.oneshot():
+                        pinfo = {
+                            "pid": proc.pid,
+                            "name": proc.name(),
+                            "cpu_percent": proc.cpu_percent(),
+                            "memory_percent": proc.memory_percent()
+                        }
                     if pinfo['cpu_percent'] > 1:  # Only show significant processes
                         info["top_processes"].append(pinfo)
-                except:
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
-            info["top_processes"].sort(key=lambda x: x['cpu_percent'], reverse=True)
-            info["top_processes"] = info["top_processes"][:10]
+            info["top_processes"] = heapq.nlargest(10, info["top_processes"], key=lambda x: x['cpu_percent'])
         
         if include_network:
             info["network"] = []
@@ -120,6 +357,85 @@ async def get_system_info(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Folder -> extensions used by the organize_desktop automation
+DESKTOP_RULES = {
+    folder: frozenset(extensions) for folder, extensions in {
+        "Documents": [".pdf", ".doc", ".docx", ".txt", ".md"],
+        "Images": [".jpg", ".jpeg", ".png", ".gif", ".svg"],
+        "Videos": [".mp4", ".mov", ".avi", ".mkv"],
+        "Archives": [".zip", ".tar", ".gz", ".dmg"],
+        "Code": [".py", ".js", ".html", ".css", ".json"]
+    }.items()
+}
+
+def iter_file_moves(source: Path, rules: Dict[str, Iterable[str]], dry_run: bool):
+    """Yield a record for each file in source matched by rules once it has been moved (or would be, if dry_run).
+
+    A move that fails yields its record with an "error" field instead of raising, so a stream still ends cleanly.
+    """
+    created_dirs = set()
+    
+    # Flatten the rules into one lookup; the first rule listing an extension wins
+    folder_for_extension = {}
+    for folder, extensions in rules.items():
+        for ext in extensions:
+            ext = ext.lower()
+            folder_for_extension.setdefault(ext if ext.startswith('.') else f'.{ext}', folder)
+    
+    # scandir hands back cached type/stat info, saving a syscall per entry. The listing is
+    # taken in full before anything moves: readdir results are unspecified once the directory changes.
+    with os.scandir(source) as it:
+        entries = list(it)
+    
+    for entry in entries:
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        
+        extension = os.path.splitext(entry.name)[1].lower()
+        
+        target_folder = folder_for_extension.get(extension)
+        
+        if target_folder:
+            target_dir = source / target_folder
+            target_path = target_dir / entry.name
+            
+            record = {
+                "source": entry.path,
+                "destination": str(target_path),
+                "size": entry.stat(follow_symlinks=False).st_size
+            }
+            
+            # Move first, report after: a record is only sent for work that actually happened
+            if not dry_run:
+                try:
+                    if target_folder not in created_dirs:
+                        target_dir.mkdir(exist_ok=True)
+                        created_dirs.add(target_folder)
+                    try:
+                        os.rename(entry.path, target_path)
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            raise
+                        shutil.move(entry.path, str(target_path))  # Different volume
+                except OSError as e:
+                    record["error"] = str(e)
+            
+            yield record
+
+def stream_file_moves(moves, dry_run: bool):
+    """NDJSON lines for each move, followed by a summary line"""
+    total = failed = 0
+    for move in moves:
+        total += 1
+        failed += "error" in move
+        yield json.dumps(move) + "\n"
+    yield json.dumps({
+        "dry_run": dry_run,
+        "total_files": total,
+        "failed": failed,
+        "message": "Files organized" if not dry_run else "Dry run completed"
+    }) + "\n"
+
 @app.post("/api/files/organize")
 async def organize_files(request: FileOrganizeRequest):
     """Organize files based on rules"""
@@ -128,36 +444,20 @@ async def organize_files(request: FileOrganizeRequest):
         if not source.exists():
             raise HTTPException(status_code=404, detail="Source directory not found")
         
-        moves = []
+        moves = iter_file_moves(source, request.rules, request.dry_run)
         
-        for file_path in source.iterdir():
-            if file_path.is_file():
-                extension = file_path.suffix.lower()
-                
-                # Find matching rule
-                target_folder = None
-                for folder, extensions in request.rules.items():
-                    if extension in extensions or extension[1:] in extensions:
-                        target_folder = folder
-                        break
-                
-                if target_folder:
-                    target_dir = source / target_folder
-                    target_path = target_dir / file_path.name
-                    
-                    moves.append({
-                        "source": str(file_path),
-                        "destination": str(target_path),
-                        "size": file_path.stat().st_size
-                    })
-                    
-                    if not request.dry_run:
-                        target_dir.mkdir(exist_ok=True)
-                        shutil.move(str(file_path), str(target_path))
+        if request.stream:
+            return StreamingResponse(
+                stream_file_moves(moves, request.dry_run),
+                media_type="application/x-ndjson"
+            )
+        
+        moves = list(moves)
         
         return {
             "dry_run": request.dry_run,
             "total_files": len(moves),
+            "failed": sum("error" in move for move in moves),
             "moves": moves,
             "message": "Files organized" if not request.dry_run else "Dry run completed"
         }
@@ -165,131 +465,212 @@ async def organize_files(request: FileOrganizeRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_command(cmd: List[str], input: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Run an external command without blocking the event loop"""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate(input.encode() if input is not None else None)
+    return subprocess.CompletedProcess(
+        cmd, proc.returncode,
+        stdout.decode(errors='replace'), stderr.decode(errors='replace')
+    )
+
+def clone_or_copy(src: Path, dest: Path):
+    """Copy src to dest, as a copy-on-write clone when the volume supports it"""
+    if clonefile is not None and clonefile(os.fsencode(src), os.fsencode(dest), 0) == 0:
+        return
+    shutil.copy2(src, dest)
+
+def cleanup_downloads(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove downloads older than `days_old` days"""
+    downloads = Path("~/Downloads").expanduser()
+    days_old = parameters.get("days_old", 30)
+    cutoff = datetime.now() - timedelta(days=days_old)
+    
+    cleaned = []
+    total_size = 0
+    
+    for file in downloads.iterdir():
+        if file.is_file():
+            mtime = datetime.fromtimestamp(file.stat().st_mtime)
+            if mtime < cutoff:
+                size = file.stat().st_size
+                cleaned.append({
+                    "file": file.name,
+                    "size": size,
+                    "age_days": (datetime.now() - mtime).days
+                })
+                total_size += size
+                
+                if not parameters.get("dry_run", True):
+                    file.unlink()
+    
+    return {
+        "action": "cleanup_downloads",
+        "files_removed": len(cleaned),
+        "space_freed": total_size,
+        "details": cleaned[:20]  # Show first 20
+    }
+
+def backup_configs(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy important configuration files into a timestamped backup folder"""
+    backup_dir = Path("~/Documents/MacConfigBackup").expanduser()
+    backup_dir.mkdir(exist_ok=True)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_folder = backup_dir / timestamp
+    backup_folder.mkdir()
+    
+    configs = [
+        "~/.zshrc",
+        "~/.bashrc",
+        "~/.gitconfig",
+        "~/.ssh/config",
+        "~/Library/Preferences/com.apple.Terminal.plist"
+    ]
+    
+    backed_up = []
+    for config in configs:
+        config_path = Path(config).expanduser()
+        if config_path.exists():
+            dest = backup_folder / config_path.name
+            clone_or_copy(config_path, dest)
+            backed_up.append(str(config_path))
+    
+    return {
+        "action": "backup_configs",
+        "backup_location": str(backup_folder),
+        "files_backed_up": backed_up
+    }
+
+async def optimize_storage(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Find large duplicate files and report the space they waste"""
+    target_dir = Path(parameters.get("directory", "~")).expanduser()
+    
+    duplicates = await find_duplicate_files(target_dir)
+    
+    total_duplicate_size = sum(d["size"] for d in duplicates)
+    
+    return {
+        "action": "optimize_storage",
+        "duplicates_found": len(duplicates),
+        "potential_savings": total_duplicate_size,
+        "duplicates": duplicates[:50]  # Show first 50
+    }
+
+# Long-running automations run as background jobs
+JOB_ACTIONS = {
+    "cleanup_downloads": cleanup_downloads,
+    "backup_configs": backup_configs,
+    "optimize_storage": optimize_storage
+}
+
+def update_job(job_id: str, **fields):
+    """Set columns on a job row"""
+    with sqlite3.connect(JOBS_DB) as conn:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+async def run_job(job_id: str, action: str, parameters: Dict[str, Any]):
+    """Run an automation and store its outcome in the jobs database"""
+    update_job(job_id, status="running")
+    try:
+        handler = JOB_ACTIONS[action]
+        if asyncio.iscoroutinefunction(handler):
+            result = await handler(parameters)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, handler, parameters)
+        update_job(job_id, status="completed", result=json.dumps(result),
+                   finished=datetime.now().isoformat())
+    except Exception as e:
+        update_job(job_id, status="failed", error=str(e),
+                   finished=datetime.now().isoformat())
+
 @app.post("/api/automation/execute")
-async def execute_automation(request: AutomationRequest):
+async def execute_automation(request: AutomationRequest, background_tasks: BackgroundTasks):
     """Execute predefined automation workflows"""
     try:
-        if request.action == "cleanup_downloads":
-            # Clean up old downloads
-            downloads = Path("~/Downloads").expanduser()
-            days_old = request.parameters.get("days_old", 30)
-            cutoff = datetime.now() - timedelta(days=days_old)
-            
-            cleaned = []
-            total_size = 0
-            
-            for file in downloads.iterdir():
-                if file.is_file():
-                    mtime = datetime.fromtimestamp(file.stat().st_mtime)
-                    if mtime < cutoff:
-                        size = file.stat().st_size
-                        cleaned.append({
-                            "file": file.name,
-                            "size": size,
-                            "age_days": (datetime.now() - mtime).days
-                        })
-                        total_size += size
-                        
-                        if not request.parameters.get("dry_run", True):
-                            file.unlink()
+        if request.action == "optimize_storage" and request.parameters.get("stream"):
+            # Stream duplicates as NDJSON while the scan runs instead of queueing a job
+            target_dir = Path(request.parameters.get("directory", "~")).expanduser()
+            return StreamingResponse(stream_duplicates(target_dir), media_type="application/x-ndjson")
+        
+        elif request.action in JOB_ACTIONS:
+            # Queue the work and return straight away; poll /api/automation/jobs/{job_id}
+            job_id = uuid.uuid4().hex
+            with sqlite3.connect(JOBS_DB) as conn:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, action, status, created) VALUES (?, ?, ?, ?)",
+                    (job_id, request.action, "queued", datetime.now().isoformat())
+                )
+            background_tasks.add_task(run_job, job_id, request.action, request.parameters or {})
             
-            return {
-                "action": "cleanup_downloads",
-                "files_removed": len(cleaned),
-                "space_freed": total_size,
-                "details": cleaned[:20]  # Show first 20
-            }
+            return {"action": request.action, "job_id": job_id, "status": "queued"}
         
         elif request.action == "organize_desktop":
             # Organize desktop files
             desktop = Path("~/Desktop").expanduser()
             
-            rules = {
-                "Documents": [".pdf", ".doc", ".docx", ".txt", ".md"],
-                "Images": [".jpg", ".jpeg", ".png", ".gif", ".svg"],
-                "Videos": [".mp4", ".mov", ".avi", ".mkv"],
-                "Archives": [".zip", ".tar", ".gz", ".dmg"],
-                "Code": [".py", ".js", ".html", ".css", ".json"]
-            }
-            
             organize_request = FileOrganizeRequest(
                 source_directory=str(desktop),
-                rules=rules,
+                rules=DESKTOP_RULES,
                 dry_run=request.parameters.get("dry_run", True)
             )
             
             return await organize_files(organize_request)
         
-        elif request.action == "backup_configs":
-            # Backup important configuration files
-            backup_dir = Path("~/Documents/MacConfigBackup").expanduser()
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_folder = backup_dir / timestamp
-            backup_folder.mkdir()
-            
-            configs = [
-                "~/.zshrc",
-                "~/.bashrc",
-                "~/.gitconfig",
-                "~/.ssh/config",
-                "~/Library/Preferences/com.apple.Terminal.plist"
-            ]
-            
-            backed_up = []
-            for config in configs:
-                config_path = Path(config).expanduser()
-                if config_path.exists():
-                    dest = backup_folder / config_path.name
-                    shutil.copy2(config_path, dest)
-                    backed_up.append(str(config_path))
-            
-            return {
-                "action": "backup_configs",
-                "backup_location": str(backup_folder),
-                "files_backed_up": backed_up
-            }
-        
-        elif request.action == "optimize_storage":
-            # Find and suggest removal of large duplicate files
-            target_dir = Path(request.parameters.get("directory", "~")).expanduser()
-            
-            file_hashes = {}
-            duplicates = []
-            
-            for file_path in target_dir.rglob("*"):
-                if file_path.is_file() and file_path.stat().st_size > 1024 * 1024:  # > 1MB
-                    try:
-                        with open(file_path, 'rb') as f:
-                            file_hash = hashlib.md5(f.read(1024 * 1024)).hexdigest()  # First 1MB
-                        
-                        if file_hash in file_hashes:
-                            duplicates.append({
-                                "original": str(file_hashes[file_hash]),
-                                "duplicate": str(file_path),
-                                "size": file_path.stat().st_size
-                            })
-                        else:
-                            file_hashes[file_hash] = file_path
-                    except:
-                        continue
-            
-            total_duplicate_size = sum(d["size"] for d in duplicates)
-            
-            return {
-                "action": "optimize_storage",
-                "duplicates_found": len(duplicates),
-                "potential_savings": total_duplicate_size,
-                "duplicates": duplicates[:50]  # Show first 50
-            }
-        
         else:
             raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/automation/jobs/{job_id}")
+async def get_automation_job(job_id: str):
+    """Get the status and result of a background automation job"""
+    with sqlite3.connect(JOBS_DB) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def empty_app_entry(app: Path) -> Dict[str, Any]:
+    """Listing entry for a bundle whose metadata couldn't be read"""
+    return {
+        "name": app.name,
+        "path": str(app),
+        "bundle_id": "",
+        "version": "",
+        "size": 0
+    }
+
+def read_app_metadata(app: Path) -> Optional[Dict[str, Any]]:
+    """Read an .app bundle's Info.plist and total size; None if it has no Info.plist"""
+    info_plist = app / "Contents/Info.plist"
+    if not info_plist.exists():
+        return None
+    
+    with open(info_plist, 'rb') as f:
+        plist = plistlib.load(f)
+    
+    return {
+        "name": app.name,
+        "path": str(app),
+        "bundle_id": plist.get("CFBundleIdentifier", ""),
+        "version": plist.get("CFBundleShortVersionString", ""),
+        "size": sum(entry.stat(follow_symlinks=False).st_size for entry in scan_files(app))
+    }
+
 @app.post("/api/apps/manage")
 async def manage_applications(request: AppManagementRequest):
     """Manage macOS applications"""
@@ -299,31 +680,49 @@ async def manage_applications(request: AppManagementRequest):
             apps = []
             app_dirs = ["/Applications", "~/Applications"]
             
-            for app_dir in app_dirs:
-                app_path = Path(app_dir).expanduser()
-                if app_path.exists():
-                    for app in app_path.glob("*.app"):
-                        try:
-                            info_plist = app / "Contents/Info.plist"
-                            if info_plist.exists():
-                                with open(info_plist, 'rb') as f:
-                                    plist = plistlib.load(f)
-                                
+            with sqlite3.connect(APPS_DB) as conn:
+                # Reuse cached entries while the bundle is unchanged
+                stale = []
+                for app_dir in app_dirs:
+                    app_path = Path(app_dir).expanduser()
+                    if app_path.exists():
+                        for app in app_path.glob("*.app"):
+                            try:
+                                mtime = app.stat().st_mtime
+                            except OSError:
+                                apps.append(empty_app_entry(app))
+                                continue
+                            row = conn.execute(
+                                "SELECT bundle_id, version, size FROM apps WHERE path = ? AND mtime = ?",
+                                (str(app), mtime)
+                            ).fetchone()
+                            if row:
                                 apps.append({
                                     "name": app.name,
                                     "path": str(app),
-                                    "bundle_id": plist.get("CFBundleIdentifier", ""),
-                                    "version": plist.get("CFBundleShortVersionString", ""),
-                                    "size": sum(f.stat().st_size for f in app.rglob("*") if f.is_file())
+                                    "bundle_id": row[0],
+                                    "version": row[1],
+                                    "size": row[2]
                                 })
-                        except:
-                            apps.append({
-                                "name": app.name,
-                                "path": str(app),
-                                "bundle_id": "",
-                                "version": "",
-                                "size": 0
-                            })
+                            else:
+                                stale.append((app, mtime))
+                
+                # Read the remaining bundles concurrently on the default thread pool
+                loop = asyncio.get_running_loop()
+                results = await asyncio.gather(
+                    *(loop.run_in_executor(None, read_app_metadata, app) for app, _ in stale),
+                    return_exceptions=True
+                )
+                for (app, mtime), metadata in zip(stale, results):
+                    if isinstance(metadata, Exception):
+                        apps.append(empty_app_entry(app))
+                    elif metadata:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO apps (path, mtime, bundle_id, version, size) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (str(app), mtime, metadata["bundle_id"], metadata["version"], metadata["size"])
+                        )
+                        apps.append(metadata)
             
             return {"apps": sorted(apps, key=lambda x: x["name"])}
         
@@ -332,11 +731,7 @@ async def manage_applications(request: AppManagementRequest):
             if not request.app_name:
                 raise HTTPException(status_code=400, detail="App name required")
             
-            result = subprocess.run(
-                ["open", "-a", request.app_name],
-                capture_output=True,
-                text=True
-            )
+            result = await run_command(["open", "-a", request.app_name])
             
             if result.returncode != 0:
                 raise HTTPException(status_code=500, detail=f"Failed to launch: {result.stderr}")
@@ -348,11 +743,7 @@ async def manage_applications(request: AppManagementRequest):
             if not request.app_name:
                 raise HTTPException(status_code=400, detail="App name required")
             
-            result = subprocess.run(
-                ["osascript", "-e", f'quit app "{request.app_name}"'],
-                capture_output=True,
-                text=True
-            )
+            result = await run_command(["osascript", "-e", f'quit app "{request.app_name}"'])
             
             return {"message": f"Quit {request.app_name}"}
         
@@ -369,7 +760,7 @@ async def schedule_task(request: ScheduleTaskRequest):
         # Create launchd plist
         plist_content = {
             "Label": f"com.user.{request.name}",
-            "ProgramArguments": request.command.split(),
+            "ProgramArguments": shlex.split(request.command),
             "RunAtLoad": request.enabled,
         }
         
@@ -387,12 +778,17 @@ async def schedule_task(request: ScheduleTaskRequest):
         # Save plist
         plist_path = Path(f"~/Library/LaunchAgents/com.user.{request.name}.plist").expanduser()
         
-        with open(plist_path, 'wb') as f:
-            plistlib.dump(plist_content, f)
+        # Serialize up front and write the whole plist in one call
+        data = plistlib.dumps(plist_content)
+        fd = os.open(plist_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
         
         # Load into launchd
         if request.enabled:
-            subprocess.run(["launchctl", "load", str(plist_path)])
+            await run_command(["launchctl", "load", str(plist_path)])
         
         return {
             "task": request.name,
@@ -410,11 +806,11 @@ async def manage_clipboard(request: ClipboardRequest):
     try:
         if request.action == "get":
             # Get current clipboard content
-            result = subprocess.run(
-                ["pbpaste"],
-                capture_output=True,
-                text=True
-            )
+            if NSPasteboard:
+                content = NSPasteboard.generalPasteboard().stringForType_(NSPasteboardTypeString)
+                return {"content": content or ""}
+            
+            result = await run_command(["pbpaste"])
             
             return {"content": result.stdout}
         
@@ -423,23 +819,21 @@ async def manage_clipboard(request: ClipboardRequest):
             if not request.content:
                 raise HTTPException(status_code=400, detail="Content required")
             
-            process = subprocess.Popen(
-                ["pbcopy"],
-                stdin=subprocess.PIPE,
-                text=True
-            )
-            process.communicate(input=request.content)
+            if NSPasteboard:
+                pasteboard = NSPasteboard.generalPasteboard()
+                pasteboard.clearContents()
+                pasteboard.setString_forType_(request.content, NSPasteboardTypeString)
+            else:
+                await run_command(["pbcopy"], input=request.content)
             
             return {"message": "Clipboard updated"}
         
         elif request.action == "clear":
             # Clear clipboard
-            process = subprocess.Popen(
-                ["pbcopy"],
-                stdin=subprocess.PIPE,
-                text=True
-            )
-            process.communicate(input="")
+            if NSPasteboard:
+                NSPasteboard.generalPasteboard().clearContents()
+            else:
+                await run_command(["pbcopy"], input="")
             
             return {"message": "Clipboard cleared"}
         
@@ -454,11 +848,7 @@ async def list_shortcuts():
     """List available Shortcuts (formerly Automator workflows)"""
     try:
         # List shortcuts
-        result = subprocess.run(
-            ["shortcuts", "list"],
-            capture_output=True,
-            text=True
-        )
+        result = await run_command(["shortcuts", "list"])
         
         shortcuts = []
         for line in result.stdout.split('\n'):
@@ -475,11 +865,7 @@ async def list_shortcuts():
 async def run_shortcut(name: str):
     """Run a specific Shortcut"""
     try:
-        result = subprocess.run(
-            ["shortcuts", "run", name],
-            capture_output=True,
-            text=True
-        )
+        result = await run_command(["shortcuts", "run", name])
         
         if result.returncode != 0:
             raise HTTPException(status_code=500, detail=f"Shortcut failed: {result.stderr}")
@@ -499,6 +885,7 @@ async def root():
             "/api/system/info": "Get system information",
             "/api/files/organize": "Organize files by rules",
             "/api/automation/execute": "Execute automation workflows",
+            "/api/automation/jobs/{job_id}": "Get automation job status and result",
             "/api/apps/manage": "Manage applications",
             "/api/schedule/task": "Schedule recurring tasks",
             "/api/clipboard": "Manage clipboard",
@@ -517,4 +904,12 @@ async def root():
 if __name__ == "__main__":
     print("🖥️ Starting Mac Automation Server on http://localhost:8003")
     print("📚 API Documentation: http://localhost:8003/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    # Several workers so one slow handler can't stall the server; workers need an import string
+    uvicorn.run(
+        "mac_automation_server:app",
+        host="0.0.0.0",
+        port=8003,
+        workers=max(2, (os.cpu_count() or 2) // 2),
+        loop="uvloop",
+        http="httptools"
+    )
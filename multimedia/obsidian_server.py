@@ -6,25 +6,54 @@ Obsidian Management Server - Advanced vault management, AI-powered note generati
 import os
 import json
 import re
+import mmap
 import shutil
+import sqlite3
+import heapq
 import asyncio
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import frontmatter
 import yaml
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+try:
+    import re2 as fast_re
+except ImportError:
+    fast_re = re
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 
-app = FastAPI(title="Obsidian Management Server", version="2.0.0")
+app = FastAPI(title="Obsidian Management Server", version="2.0.0", default_response_class=ORJSONResponse)
 
 # Configuration
 OBSIDIAN_VAULT_PATH = os.path.expanduser("~/Documents/ObsidianVault")
 EXCLUDED_VAULT = "/Users/jongosussmango/Library/Mobile Documents/iCloud~md~obsidian/Documents/ObsidianTTRPGVault Experimental"
+EXCLUDED_PREFIXES = (os.path.normpath(EXCLUDED_VAULT) + os.sep,)
+INDEX_DIR = Path("~/.cache/obsidian_server").expanduser()
+INDEX_DB = INDEX_DIR / "index.db"
+LINK_RE = fast_re.compile(r'\[\[(.*?)\]\]')
+TEMPLATE_VAR_RE = re.compile(r'\{\{(content|date|time)\}\}')
+FRONTMATTER_RE = re.compile(r'\A\s*-{3,}[ \t]*\r?\n(.*?)^-{3,}[ \t]*\r?$\n?', re.DOTALL | re.MULTILINE)
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# Affinity-aware worker count; macOS has no sched_getaffinity
+SCAN_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+NOTE_CACHE_SIZE = 16384
+
+# Frontmatter keyed by path: (mtime, size, metadata). Lives in each EXECUTORS
+# worker, so repeat scans skip the YAML parse; bodies are always reread rather
+# than held in every process.
+_NOTE_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
+# One single-process pool per shard, so a path always lands in the worker
+# whose _NOTE_CACHE already holds it
+EXECUTORS = [ProcessPoolExecutor(max_workers=1) for _ in range(SCAN_WORKERS)]
 
 class NoteRequest(BaseModel):
     title: str
@@ -71,9 +100,315 @@ def ensure_vault_exists():
         os.makedirs(f"{OBSIDIAN_VAULT_PATH}/Projects")
         os.makedirs(f"{OBSIDIAN_VAULT_PATH}/Archive")
 
+async def read_text(path) -> str:
+    """Read a file on the default executor so the event loop isn't blocked"""
+    return await asyncio.get_running_loop().run_in_executor(None, Path(path).read_text)
+
+async def write_text(path, text: str):
+    """Write a file on the default executor so the event loop isn't blocked"""
+    await asyncio.get_running_loop().run_in_executor(None, Path(path).write_text, text)
+
 def is_excluded_path(path: str) -> bool:
     """Check if path is in excluded vault"""
-    return EXCLUDED_VAULT in str(path)
+    return (str(path) + os.sep).startswith(EXCLUDED_PREFIXES)
+
+def _walk_md(root: str, folder: Optional[str] = None):
+    """Yield DirEntry objects for markdown files under root, pruning the excluded vault"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        in_folder = not folder or folder in current
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_excluded_path(entry.path):
+                            stack.append(entry.path)
+                    elif in_folder and entry.name.endswith('.md'):
+                        yield entry
+        except OSError:
+            continue
+
+def collect_note_paths(folder: Optional[str] = None) -> List[str]:
+    """List markdown files in the vault, skipping the excluded vault"""
+    return [entry.path for entry in _walk_md(OBSIDIAN_VAULT_PATH, folder)]
+
+def collect_note_mtimes() -> Dict[str, float]:
+    """Map each markdown file in the vault to its mtime"""
+    mtimes = {}
+    for entry in _walk_md(OBSIDIAN_VAULT_PATH):
+        try:
+            mtimes[entry.path] = entry.stat().st_mtime
+        except OSError:
+            continue
+    return mtimes
+
+@lru_cache(maxsize=32)
+def compile_query(query: str):
+    """Case-insensitive query pattern and backlink pattern for a search"""
+    escaped = re.escape(query)
+    return (
+        fast_re.compile('(?i)' + escaped),
+        fast_re.compile(rf'\[\[{escaped}[^\]]*?\]\]')
+    )
+
+def parse_frontmatter(content: str):
+    """Split a note into (metadata, body) using libyaml when available"""
+    match = FRONTMATTER_RE.match(content)
+    if not match:
+        return {}, content
+    metadata = yaml.load(match.group(1), Loader=YAML_LOADER)
+    return metadata if isinstance(metadata, dict) else {}, content[match.end():]
+
+def normalize_tags(tags) -> list:
+    """Frontmatter tags as a list: an empty `tags:` key is None and a single tag may be a bare string"""
+    if isinstance(tags, list):
+        return tags
+    if isinstance(tags, str):
+        return [tags]
+    return []
+
+def _load_note(path: str, with_metadata: bool = True):
+    """Return (mtime, metadata, content) for a note, reparsing frontmatter only when it changed.
+
+    metadata is None when with_metadata is False.
+    """
+    with open(path, 'r') as f:
+        st = os.fstat(f.fileno())
+        content = f.read()
+    if not with_metadata:
+        return st.st_mtime, None, content
+    
+    cached = _NOTE_CACHE.get(path)
+    if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        _NOTE_CACHE.move_to_end(path)
+        return st.st_mtime, cached[2], content
+    metadata, _ = parse_frontmatter(content)
+    metadata['tags'] = normalize_tags(metadata.get('tags'))
+    _NOTE_CACHE[path] = (st.st_mtime, st.st_size, metadata)
+    if len(_NOTE_CACHE) > NOTE_CACHE_SIZE:
+        _NOTE_CACHE.popitem(last=False)
+    return st.st_mtime, metadata, content
+
+def _may_match(path: str, query: str, search_type: str) -> bool:
+    """Cheap bytes-level check on the raw file before it is decoded"""
+    query_bytes = query.encode('utf-8')
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return True
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if search_type == "backlinks":
+                return mm.find(b'[[' + query_bytes) != -1
+            # Bytes IGNORECASE only folds ASCII, so other queries go straight to the full match
+            if not query.isascii():
+                return True
+            return compile_bytes_query(query_bytes).search(mm) is not None
+
+@lru_cache(maxsize=32)
+def compile_bytes_query(query_bytes: bytes):
+    """Case-insensitive bytes pattern for the mmap prefilter"""
+    return re.compile(re.escape(query_bytes), re.IGNORECASE)
+
+def _scan_file(path: str) -> Optional[Dict[str, Any]]:
+    """Read a note and extract the fields used by the graph and stats endpoints"""
+    try:
+        mtime, metadata, content = _load_note(path)
+    except Exception:
+        return None
+    return {
+        'path': path,
+        'stem': Path(path).stem,
+        'mtime': mtime,
+        'size': len(content),
+        'word_count': len(content.split()),
+        'tags': metadata['tags'],
+        'links': [link.split('|')[0].strip() for link in LINK_RE.findall(content)]
+    }
+
+def _search_file(path: str, query: str, search_type: str, tags: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """Match a single note against a search request"""
+    # Only tag searches need the frontmatter up front; the rest parse it on a match
+    try:
+        if search_type in ("content", "backlinks") and not _may_match(path, query, search_type):
+            return None
+        _, metadata, content = _load_note(path, with_metadata=search_type == "tags")
+    except Exception:
+        return None
+    
+    query_re, backlink_re = compile_query(query)
+    file_path = Path(path)
+    
+    # Search based on type
+    match = False
+    
+    if search_type == "content":
+        if query_re.search(content):
+            match = True
+    
+    elif search_type == "title":
+        if query_re.search(file_path.name):
+            match = True
+    
+    elif search_type == "tags":
+        note_tags = metadata['tags']
+        if any(tag in note_tags for tag in tags or [query]):
+            match = True
+    
+    elif search_type == "backlinks":
+        # Search for notes that link to this one
+        if backlink_re.search(content):
+            match = True
+    
+    if not match:
+        return None
+    if metadata is None:
+        try:
+            _, metadata, content = _load_note(path)
+        except Exception:
+            return None
+    return {
+        'path': path,
+        'title': file_path.stem,
+        'preview': content[:200] + '...' if len(content) > 200 else content,
+        'tags': metadata['tags'],
+        'modified': metadata.get('modified', ''),
+        'matches': sum(1 for _ in query_re.finditer(content))
+    }
+
+def shard_paths(paths: List[str]) -> List[tuple]:
+    """Split paths by path hash into (executor, shard) pairs, pinning each shard to its worker"""
+    shards = [[] for _ in EXECUTORS]
+    for path in paths:
+        shards[hash(path) % len(EXECUTORS)].append(path)
+    return [(executor, shard) for executor, shard in zip(EXECUTORS, shards) if shard]
+
+def _scan_shard(func, paths: List[str]) -> List[Dict[str, Any]]:
+    """Apply a per-note function to a whole shard inside one worker"""
+    results = []
+    for path in paths:
+        result = func(path)
+        if result is not None:
+            results.append(result)
+    return results
+
+async def scan_notes(func, paths: List[str]) -> List[Dict[str, Any]]:
+    """Run a per-note function across EXECUTORS, one task per shard, dropping unreadable notes"""
+    loop = asyncio.get_running_loop()
+    shards = await asyncio.gather(
+        *(loop.run_in_executor(executor, _scan_shard, func, shard) for executor, shard in shard_paths(paths))
+    )
+    return [result for shard in shards for result in shard]
+
+def _top_matches(search, paths: List[str], limit: int):
+    """Return (match count, best `limit` matches) for a shard, keeping only a bounded heap"""
+    count = 0
+    top = []
+    for i, result in enumerate(map(search, paths)):
+        if result is None:
+            continue
+        count += 1
+        # -i breaks ties in favour of earlier notes and keeps dicts out of comparisons
+        item = (result['matches'], -i, result)
+        if len(top) < limit:
+            heapq.heappush(top, item)
+        else:
+            heapq.heappushpop(top, item)
+    return count, [result for _, _, result in sorted(top, reverse=True)]
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    for executor in EXECUTORS:
+        executor.shutdown(wait=False)
+
+@app.on_event("startup")
+async def init_index():
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(INDEX_DB) as conn:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS notes (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                length INTEGER NOT NULL,
+                words INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS links (src TEXT NOT NULL, tgt TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS tags (note TEXT NOT NULL, tag TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS links_src ON links (src);
+            CREATE INDEX IF NOT EXISTS tags_note ON tags (note);
+        """)
+
+def _index_diff(mtimes: Dict[str, float]):
+    """Return (stale or new paths, paths to drop) against the index"""
+    with sqlite3.connect(INDEX_DB) as conn:
+        indexed = dict(conn.execute("SELECT path, mtime FROM notes"))
+    stale = [path for path, mtime in mtimes.items() if indexed.get(path) != mtime]
+    removed = [path for path in indexed if path not in mtimes]
+    return stale, removed
+
+def _index_update(dropped: List[str], scanned: List[Dict[str, Any]]):
+    """Replace index rows for changed notes in a single transaction"""
+    dropped = [(path,) for path in dropped]
+    with sqlite3.connect(INDEX_DB) as conn:
+        conn.executemany("DELETE FROM notes WHERE path = ?", dropped)
+        conn.executemany("DELETE FROM links WHERE src = ?", dropped)
+        conn.executemany("DELETE FROM tags WHERE note = ?", dropped)
+        conn.executemany(
+            "INSERT INTO notes (path, mtime, length, words) VALUES (?, ?, ?, ?)",
+            [(n['path'], n['mtime'], n['size'], n['word_count']) for n in scanned]
+        )
+        conn.executemany(
+            "INSERT INTO links (src, tgt) VALUES (?, ?)",
+            [(n['path'], link) for n in scanned for link in n['links']]
+        )
+        conn.executemany(
+            "INSERT INTO tags (note, tag) VALUES (?, ?)",
+            [(n['path'], tag if isinstance(tag, str) else str(tag)) for n in scanned for tag in n['tags']]
+        )
+
+def _index_read() -> List[Dict[str, Any]]:
+    """Load every indexed note in the same shape _scan_file returns"""
+    with sqlite3.connect(INDEX_DB) as conn:
+        notes = {
+            path: {
+                'path': path,
+                'stem': Path(path).stem,
+                'mtime': mtime,
+                'size': length,
+                'word_count': words,
+                'tags': [],
+                'links': []
+            }
+            for path, mtime, length, words in conn.execute("SELECT path, mtime, length, words FROM notes ORDER BY path")
+        }
+        for note, tag in conn.execute("SELECT note, tag FROM tags ORDER BY rowid"):
+            notes[note]['tags'].append(tag)
+        for src, tgt in conn.execute("SELECT src, tgt FROM links ORDER BY rowid"):
+            notes[src]['links'].append(tgt)
+    return list(notes.values())
+
+def _index_totals() -> Dict[str, Any]:
+    """Aggregate vault statistics inside SQLite"""
+    with sqlite3.connect(INDEX_DB) as conn:
+        return {
+            'words': conn.execute("SELECT COALESCE(SUM(words), 0) FROM notes").fetchone()[0],
+            'links': conn.execute("SELECT COUNT(*) FROM links").fetchone()[0],
+            'linked': {tgt for tgt, in conn.execute("SELECT DISTINCT tgt FROM links")},
+            'tags': [tag for tag, in conn.execute("SELECT DISTINCT tag FROM tags")],
+            'notes': conn.execute("SELECT path, mtime FROM notes").fetchall()
+        }
+
+async def refresh_index(mtimes: Dict[str, float]):
+    """Rescan new and changed notes into the SQLite index and drop deleted ones"""
+    loop = asyncio.get_running_loop()
+    stale, removed = await loop.run_in_executor(None, _index_diff, mtimes)
+    if stale or removed:
+        scanned = await scan_notes(_scan_file, stale) if stale else []
+        await loop.run_in_executor(None, _index_update, stale + removed, scanned)
+
+async def indexed_notes(mtimes: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Refresh the SQLite index for changed notes only, then read it back"""
+    await refresh_index(mtimes)
+    return await asyncio.get_running_loop().run_in_executor(None, _index_read)
 
 @app.post("/api/notes/create")
 async def create_note(request: NoteRequest):
@@ -93,10 +428,12 @@ async def create_note(request: NoteRequest):
         folder_path.mkdir(parents=True, exist_ok=True)
         
         # Create note with frontmatter
+        now = datetime.now()
+        now_iso = now.isoformat()
         note_data = {
             'title': request.title,
-            'created': datetime.now().isoformat(),
-            'modified': datetime.now().isoformat(),
+            'created': now_iso,
+            'modified': now_iso,
             'tags': request.tags or [],
         }
         
@@ -108,18 +445,19 @@ async def create_note(request: NoteRequest):
         if request.template:
             template_path = Path(OBSIDIAN_VAULT_PATH) / "Templates" / f"{request.template}.md"
             if template_path.exists():
-                with open(template_path, 'r') as f:
-                    template_content = f.read()
-                content = template_content.replace('{{content}}', content)
-                content = content.replace('{{date}}', datetime.now().strftime('%Y-%m-%d'))
-                content = content.replace('{{time}}', datetime.now().strftime('%H:%M'))
+                template_content = await read_text(template_path)
+                values = {
+                    'content': content,
+                    'date': now.strftime('%Y-%m-%d'),
+                    'time': now.strftime('%H:%M')
+                }
+                content = TEMPLATE_VAR_RE.sub(lambda m: values[m.group(1)], template_content)
         
         # Create the note file
         note_path = folder_path / f"{request.title}.md"
         post = frontmatter.Post(content, **note_data)
         
-        with open(note_path, 'w') as f:
-            f.write(frontmatter.dumps(post))
+        await write_text(note_path, frontmatter.dumps(post))
         
         return {
             "success": True,
@@ -135,68 +473,30 @@ async def search_notes(request: SearchRequest):
     """Search notes in the vault"""
     try:
         ensure_vault_exists()
-        results = []
         
-        for root, dirs, files in os.walk(OBSIDIAN_VAULT_PATH):
-            if is_excluded_path(root):
-                continue
-                
-            # Filter by folder if specified
-            if request.folder and request.folder not in root:
-                continue
-            
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = Path(root) / file
-                    
-                    try:
-                        with open(file_path, 'r') as f:
-                            content = f.read()
-                        
-                        post = frontmatter.loads(content)
-                        
-                        # Search based on type
-                        match = False
-                        
-                        if request.search_type == "content":
-                            if request.query.lower() in content.lower():
-                                match = True
-                        
-                        elif request.search_type == "title":
-                            if request.query.lower() in file.lower():
-                                match = True
-                        
-                        elif request.search_type == "tags":
-                            note_tags = post.metadata.get('tags', [])
-                            if any(tag in note_tags for tag in request.tags or [request.query]):
-                                match = True
-                        
-                        elif request.search_type == "backlinks":
-                            # Search for notes that link to this one
-                            link_pattern = rf'\[\[{request.query}.*?\]\]'
-                            if re.search(link_pattern, content):
-                                match = True
-                        
-                        if match:
-                            results.append({
-                                'path': str(file_path),
-                                'title': file_path.stem,
-                                'preview': content[:200] + '...' if len(content) > 200 else content,
-                                'tags': post.metadata.get('tags', []),
-                                'modified': post.metadata.get('modified', ''),
-                                'matches': len(re.findall(request.query, content, re.IGNORECASE))
-                            })
-                    
-                    except Exception as e:
-                        continue
-        
-        # Sort by relevance (number of matches)
-        results.sort(key=lambda x: x['matches'], reverse=True)
+        search = partial(
+            _search_file,
+            query=request.query,
+            search_type=request.search_type,
+            tags=request.tags
+        )
+        # Most relevant (by number of matches) first
+        loop = asyncio.get_running_loop()
+        shards = await asyncio.gather(*(
+            loop.run_in_executor(executor, _top_matches, search, shard, request.limit)
+            for executor, shard in shard_paths(collect_note_paths(request.folder))
+        ))
+        count = sum(shard_count for shard_count, _ in shards)
+        results = heapq.nlargest(
+            max(request.limit, 0),
+            (result for _, top in shards for result in top),
+            key=lambda result: result['matches']
+        )
         
         return {
             "query": request.query,
-            "count": len(results),
-            "results": results[:request.limit]
+            "count": count,
+            "results": results
         }
         
     except Exception as e:
@@ -209,86 +509,69 @@ async def generate_graph(request: GraphRequest):
         ensure_vault_exists()
         
         nodes = {}
-        edges = []
+        # Keyed by (source, target, type) so repeated links collapse; dicts keep first-seen order
+        edge_keys = {}
         
         # Build the graph
-        for root, dirs, files in os.walk(OBSIDIAN_VAULT_PATH):
-            if is_excluded_path(root):
-                continue
-                
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = Path(root) / file
-                    note_name = file_path.stem
-                    
-                    try:
-                        with open(file_path, 'r') as f:
-                            content = f.read()
-                        
-                        post = frontmatter.loads(content)
-                        
-                        # Add node
-                        nodes[note_name] = {
-                            'id': note_name,
-                            'label': note_name,
-                            'path': str(file_path),
-                            'tags': post.metadata.get('tags', []),
-                            'size': len(content),
-                            'type': 'note'
+        for note in await indexed_notes(collect_note_mtimes()):
+            note_name = note['stem']
+            
+            # Add node
+            nodes[note_name] = {
+                'id': note_name,
+                'label': note_name,
+                'path': note['path'],
+                'tags': note['tags'],
+                'size': note['size'],
+                'type': 'note'
+            }
+            
+            for link in note['links']:
+                edge_keys[(note_name, link, 'link')] = None
+            
+            # Add tag nodes if requested
+            if request.include_tags:
+                for tag in note['tags']:
+                    if tag not in nodes:
+                        nodes[tag] = {
+                            'id': tag,
+                            'label': f"#{tag}",
+                            'type': 'tag',
+                            'size': 1
                         }
-                        
-                        # Find links
-                        link_pattern = r'\[\[(.*?)\]\]'
-                        links = re.findall(link_pattern, content)
-                        
-                        for link in links:
-                            # Clean link (remove aliases)
-                            clean_link = link.split('|')[0].strip()
-                            edges.append({
-                                'source': note_name,
-                                'target': clean_link,
-                                'type': 'link'
-                            })
-                        
-                        # Add tag nodes if requested
-                        if request.include_tags:
-                            for tag in post.metadata.get('tags', []):
-                                if tag not in nodes:
-                                    nodes[tag] = {
-                                        'id': tag,
-                                        'label': f"#{tag}",
-                                        'type': 'tag',
-                                        'size': 1
-                                    }
-                                edges.append({
-                                    'source': note_name,
-                                    'target': tag,
-                                    'type': 'tag'
-                                })
-                    
-                    except Exception as e:
-                        continue
+                    edge_keys[(note_name, tag, 'tag')] = None
+        
+        edges = [
+            {'source': source, 'target': target, 'type': edge_type}
+            for source, target, edge_type in edge_keys
+        ]
         
         # Filter by depth if a specific node is requested
         if request.node and request.node in nodes:
             filtered_nodes = {}
             filtered_edges = []
             
-            def traverse(node, depth):
+            adjacency = defaultdict(list)
+            for edge in edges:
+                adjacency[edge['source']].append((edge['target'], edge))
+                adjacency[edge['target']].append((edge['source'], edge))
+            
+            # Breadth-first walk out to the requested depth
+            queue = deque([(request.node, request.depth)])
+            seen = {request.node}
+            while queue:
+                node, depth = queue.popleft()
                 if depth <= 0 or node not in nodes:
-                    return
+                    continue
                 
                 filtered_nodes[node] = nodes[node]
                 
-                for edge in edges:
-                    if edge['source'] == node and edge['target'] not in filtered_nodes:
-                        filtered_edges.append(edge)
-                        traverse(edge['target'], depth - 1)
-                    elif edge['target'] == node and edge['source'] not in filtered_nodes:
+                for neighbor, edge in adjacency[node]:
+                    if neighbor not in filtered_nodes:
                         filtered_edges.append(edge)
-                        traverse(edge['source'], depth - 1)
-            
-            traverse(request.node, request.depth)
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        queue.append((neighbor, depth - 1))
             nodes = filtered_nodes
             edges = filtered_edges
         
@@ -310,10 +593,12 @@ async def execute_workflow(request: WorkflowRequest):
     """Execute predefined workflows"""
     try:
         ensure_vault_exists()
+        now = datetime.now()
+        today = now.date()
         
         if request.workflow_type == "daily_note":
             # Create daily note
-            date = datetime.now().strftime('%Y-%m-%d')
+            date = today.isoformat()
             
             content = f"""# Daily Note - {date}
 
@@ -334,7 +619,7 @@ async def execute_workflow(request: WorkflowRequest):
 
 
 ## 🔗 Related Notes
-- [[{(datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')}|Yesterday]]
+- [[{(today - timedelta(days=1)).isoformat()}|Yesterday]]
 - [[Weekly Review]]
 """
             
@@ -351,8 +636,8 @@ async def execute_workflow(request: WorkflowRequest):
         
         elif request.workflow_type == "weekly_review":
             # Create weekly review
-            week_num = datetime.now().isocalendar()[1]
-            year = datetime.now().year
+            week_num = now.isocalendar()[1]
+            year = now.year
             
             content = f"""# Weekly Review - Week {week_num}, {year}
 
@@ -384,9 +669,9 @@ async def execute_workflow(request: WorkflowRequest):
 ## 🔗 Daily Notes This Week
 """
             # Add links to daily notes
-            for i in range(7):
-                date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-                content += f"- [[{date}]]\n"
+            content += ''.join(
+                f"- [[{(today - timedelta(days=i)).isoformat()}]]\n" for i in range(7)
+            )
             
             note_request = NoteRequest(
                 title=f"Week {week_num} - {year}",
@@ -411,7 +696,7 @@ async def execute_workflow(request: WorkflowRequest):
             overview_content = f"""# {project_name}
 
 ## 📋 Project Overview
-**Start Date:** {datetime.now().strftime('%Y-%m-%d')}
+**Start Date:** {today.isoformat()}
 **Status:** 🟡 In Progress
 **Priority:** High
 
@@ -434,14 +719,13 @@ async def execute_workflow(request: WorkflowRequest):
 ## 📊 Progress Log
 """
             
-            # Create main project note
-            with open(project_folder / f"{project_name}.md", 'w') as f:
-                f.write(overview_content)
-            
-            # Create supporting notes
-            for suffix in ["Research", "Tasks", "Meetings"]:
-                with open(project_folder / f"{project_name} - {suffix}.md", 'w') as f:
-                    f.write(f"# {project_name} - {suffix}\n\n")
+            # Create main project note and supporting notes together
+            files = [(project_folder / f"{project_name}.md", overview_content)]
+            files.extend(
+                (project_folder / f"{project_name} - {suffix}.md", f"# {project_name} - {suffix}\n\n")
+                for suffix in ["Research", "Tasks", "Meetings"]
+            )
+            await asyncio.gather(*(write_text(path, body) for path, body in files))
             
             return {
                 "success": True,
@@ -454,29 +738,26 @@ async def execute_workflow(request: WorkflowRequest):
             topic = request.parameters.get('topic', 'Research')
             sources = request.parameters.get('sources', [])
             
-            compiled_content = f"""# {topic} - Research Compilation
-**Compiled:** {datetime.now().strftime('%Y-%m-%d %H:%M')}
+            parts = [f"""# {topic} - Research Compilation
+**Compiled:** {now.strftime('%Y-%m-%d %H:%M')}
 
 ## 📚 Sources
-"""
-            
-            for source in sources:
-                compiled_content += f"- [[{source}]]\n"
-            
-            compiled_content += "\n## 📝 Compiled Notes\n\n"
+"""]
+            parts.extend(f"- [[{source}]]\n" for source in sources)
+            parts.append("\n## 📝 Compiled Notes\n\n")
             
             # Read and compile content from sources
             for source in sources:
                 source_path = Path(OBSIDIAN_VAULT_PATH) / f"{source}.md"
                 if source_path.exists():
-                    with open(source_path, 'r') as f:
-                        content = f.read()
+                    content = await read_text(source_path)
                     
                     # Extract main content (skip frontmatter)
-                    post = frontmatter.loads(content)
-                    compiled_content += f"### From: {source}\n{post.content}\n\n---\n\n"
+                    _, body = parse_frontmatter(content)
+                    parts.extend((f"### From: {source}\n", body.strip(), "\n\n---\n\n"))
             
-            compiled_content += "## 🎯 Key Takeaways\n- \n\n## 🔮 Next Steps\n- "
+            parts.append("## 🎯 Key Takeaways\n- \n\n## 🔮 Next Steps\n- ")
+            compiled_content = ''.join(parts)
             
             note_request = NoteRequest(
                 title=f"{topic} - Compilation",
@@ -570,67 +851,44 @@ async def get_vault_stats():
             "total_notes": 0,
             "total_words": 0,
             "total_links": 0,
-            "total_tags": set(),
+            "total_tags": [],
             "folders": defaultdict(int),
             "recent_notes": [],
             "orphan_notes": []
         }
         
         all_notes = set()
-        linked_notes = set()
         
-        for root, dirs, files in os.walk(OBSIDIAN_VAULT_PATH):
-            if is_excluded_path(root):
-                continue
-                
-            folder_name = Path(root).relative_to(OBSIDIAN_VAULT_PATH).as_posix()
+        mtimes = collect_note_mtimes()
+        for path in mtimes:
+            folder_name = Path(path).parent.relative_to(OBSIDIAN_VAULT_PATH).as_posix()
+            all_notes.add(Path(path).stem)
             
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = Path(root) / file
-                    all_notes.add(file_path.stem)
-                    
-                    stats['total_notes'] += 1
-                    stats['folders'][folder_name] += 1
-                    
-                    try:
-                        with open(file_path, 'r') as f:
-                            content = f.read()
-                        
-                        # Count words
-                        stats['total_words'] += len(content.split())
-                        
-                        # Count links
-                        links = re.findall(r'\[\[(.*?)\]\]', content)
-                        stats['total_links'] += len(links)
-                        for link in links:
-                            linked_notes.add(link.split('|')[0].strip())
-                        
-                        # Extract tags
-                        post = frontmatter.loads(content)
-                        for tag in post.metadata.get('tags', []):
-                            stats['total_tags'].add(tag)
-                        
-                        # Track recent notes
-                        mtime = os.path.getmtime(file_path)
-                        stats['recent_notes'].append({
-                            'title': file_path.stem,
-                            'path': str(file_path),
-                            'modified': datetime.fromtimestamp(mtime).isoformat()
-                        })
-                    
-                    except Exception as e:
-                        continue
+            stats['total_notes'] += 1
+            stats['folders'][folder_name] += 1
+        
+        # Word, link and tag totals are aggregated by SQLite
+        await refresh_index(mtimes)
+        totals = await asyncio.get_running_loop().run_in_executor(None, _index_totals)
+        stats['total_words'] = totals['words']
+        stats['total_links'] = totals['links']
+        stats['total_tags'] = totals['tags']
+        linked_notes = totals['linked']
+        
+        # Ten most recently modified notes
+        recent = heapq.nlargest(10, totals['notes'], key=lambda note: note[1])
+        stats['recent_notes'] = [
+            {
+                'title': Path(path).stem,
+                'path': path,
+                'modified': datetime.fromtimestamp(mtime).isoformat()
+            }
+            for path, mtime in recent
+        ]
         
         # Find orphan notes (no incoming or outgoing links)
         stats['orphan_notes'] = list(all_notes - linked_notes)
         
-        # Sort recent notes
-        stats['recent_notes'].sort(key=lambda x: x['modified'], reverse=True)
-        stats['recent_notes'] = stats['recent_notes'][:10]
-        
-        # Convert set to list for JSON
-        stats['total_tags'] = list(stats['total_tags'])
         stats['folders'] = dict(stats['folders'])
         
         return stats
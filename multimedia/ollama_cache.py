@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of Ollama responses for the integration test scripts
+"""
+
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+CACHE_DIR = Path("~/.cache/ollama_test").expanduser()
+CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached response is refetched
+
+# Set to False (e.g. via --no-cache) to always hit Ollama
+ENABLED = True
+
+# Request fields that don't change the generated text
+IGNORED_FIELDS = ("stream", "keep_alive")
+
+# Responses stored during this run, written out together by flush()
+PENDING: Dict[str, Dict[str, Any]] = {}
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """SHA-256 of the request fields that determine the output"""
+    relevant = {k: v for k, v in payload.items() if k not in IGNORED_FIELDS}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+def cacheable(payload: Dict[str, Any]) -> bool:
+    """Only deterministic requests are cached unless OLLAMA_TEST_CACHE_NONDETERMINISTIC=1"""
+    if not ENABLED:
+        return False
+    if os.environ.get("OLLAMA_TEST_CACHE_NONDETERMINISTIC") == "1":
+        return True
+    return payload.get("options", {}).get("temperature") == 0
+
+def load(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return a fresh cached response for payload, if any"""
+    if not cacheable(payload):
+        return None
+    key = cache_key(payload)
+    if key in PENDING:
+        return PENDING[key]
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > CACHE_TTL:
+            return None
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+def store(payload: Dict[str, Any], response: Dict[str, Any]):
+    """Buffer a response for payload until flush()"""
+    if cacheable(payload):
+        PENDING[cache_key(payload)] = response
+
+def flush():
+    """Write buffered responses; atomic renames so concurrent runs never read partial files"""
+    if not PENDING:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for key, response in PENDING.items():
+        path = CACHE_DIR / f"{key}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(response))
+        os.replace(tmp, path)
+    PENDING.clear()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Endpoints used by the integration test scripts, parsed once at import
+"""
+
+import os
+from yarl import URL
+
+def _base(env_var: str, default: str) -> URL:
+    """Base URL from env_var; accepts Ollama-style host:port without a scheme"""
+    value = os.environ.get(env_var, default)
+    if "://" not in value:
+        value = f"http://{value}"
+    return URL(value)
+
+# Set OLLAMA_HOST (e.g. gpu-box:11434) to test against a remote Ollama
+OLLAMA = _base("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_TAGS = OLLAMA / "api" / "tags"
+OLLAMA_GENERATE = OLLAMA / "api" / "generate"
+OLLAMA_CHAT = OLLAMA / "api" / "chat"
+
+LLM_SERVER = _base("LLM_SERVER_URL", "http://localhost:8005")
+LLM_SERVER_CHAT = LLM_SERVER / "api" / "chat"
+
+VIDEO_GEN = _base("VIDEO_GEN_URL", "http://localhost:8006")
+VIDEO_GEN_MODELS = VIDEO_GEN / "api" / "models" / "list"
+VIDEO_GEN_IMAGE_TO_VIDEO = VIDEO_GEN / "api" / "video" / "image_to_video"
+
+WORKFLOWS = _base("WORKFLOWS_URL", "http://localhost:8007")
+WORKFLOW_TEXT_TO_VIDEO = WORKFLOWS / "api" / "workflow" / "text_to_video"
+WORKFLOW_STORY_TO_VIDEO = WORKFLOWS / "api" / "workflow" / "story_to_video"
+WORKFLOW_CAPABILITIES = WORKFLOWS / "api" / "workflow" / "capabilities"
@@ -56,9 +56,15 @@ start_server() {
 echo -e "${BLUE}Checking dependencies...${NC}"
 pip3 list | grep -q fastapi || pip3 install fastapi uvicorn
 pip3 list | grep -q aiohttp || pip3 install aiohttp
-pip3 list | grep -q psutil || pip3 install psutil
+pip3 list | grep -q uvloop || pip3 install uvloop httptools
+pip3 list | grep -q orjson || pip3 install orjson
+python3 -c "import psutil, sys; sys.exit(tuple(map(int, psutil.__version__.split('.')[:3])) < (5, 9, 1))" 2>/dev/null || pip3 install "psutil>=5.9.1"
 pip3 list | grep -q frontmatter || pip3 install python-frontmatter
+pip3 list | grep -q google-re2 || pip3 install google-re2
 pip3 list | grep -q Pillow || pip3 install Pillow
+pip3 list | grep -q numpy || pip3 install numpy
+pip3 list | grep -q soundfile || pip3 install soundfile
+pip3 list | grep -q huggingface-hub || pip3 install huggingface_hub
 
 echo ""
 echo "Starting servers..."
@@ -1,13 +1,30 @@
 #!/usr/bin/env python3
 """
 Test script to verify LLM integration with your local Ollama installation
+
+Runs on uvloop when it is installed (recommended for CI); falls back to asyncio's default loop.
 """
 
 import asyncio
 import aiohttp
 import json
+import time
+import argparse
+import orjson
 from typing import Dict, Any
 
+import ollama_cache
+import service_urls as urls
+from test_support import (
+    log, start_log_writer, stop_log_writer, gather_bounded, new_connector, keepalive_pinger
+)
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # Your available models
 AVAILABLE_MODELS = [
     "mistral:7b-instruct",
@@ -19,191 +36,292 @@ AVAILABLE_MODELS = [
     "gpt-oss:20b"
 ]
 
-async def test_ollama_direct():
+# Models exercised by the generation, chat and code tests
+GENERATION_MODEL = "llama3.2:3b"  # Small, fast model
+CHAT_MODEL = "mistral:7b-instruct"  # Good for chat
+CODE_MODEL = "deepseek-coder:6.7b-instruct"  # Specialized for code
+USED_MODELS = (GENERATION_MODEL, CHAT_MODEL, CODE_MODEL)
+
+# Static prompt text goes first so Ollama can reuse the cached KV prefix across runs
+SYSTEM_PROMPT = "You are a helpful coding assistant."
+CODE_INSTRUCTIONS = """You write Python code. Include docstring and type hints.
+
+"""
+
+HEADERS = {"Content-Type": "application/json"}
+
+# Fixed seed and greedy decoding make replies reproducible, so they can be cached and compared
+DETERMINISTIC_OPTIONS = {"seed": 42, "temperature": 0}
+
+# Keep models resident across the whole run instead of reloading between tests
+KEEP_ALIVE = "30m"
+
+# Fail a streamed generation if Ollama goes this long without sending a chunk
+STREAM_STALL_TIMEOUT = 30
+
+# Fail fast when a server is down; generations themselves may legitimately take minutes
+SESSION_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5)
+
+async def read_stream(response: aiohttp.ClientResponse, extract, started: float):
+    """Collect a streamed Ollama reply; returns (text, seconds to first token, prompt tokens evaluated)"""
+    parts = []
+    first_token = None
+    prompt_tokens = None
+    while True:
+        line = await asyncio.wait_for(response.content.readline(), STREAM_STALL_TIMEOUT)
+        if not line:
+            break
+        chunk = orjson.loads(line)
+        text = extract(chunk)
+        if text and first_token is None:
+            first_token = time.perf_counter() - started
+        parts.append(text)
+        if chunk.get("done"):
+            prompt_tokens = chunk.get("prompt_eval_count", 0)
+            break
+    return "".join(parts), first_token, prompt_tokens
+
+async def stream_request(session: aiohttp.ClientSession, url: str, payload: Dict[str, Any], extract):
+    """Streamed Ollama request served from the disk cache when possible.
+
+    Returns (status, text, seconds to first token, prompt tokens evaluated).
+    """
+    cached = ollama_cache.load(payload)
+    if cached is not None:
+        return 200, cached["text"], 0.0, 0
+    
+    started = time.perf_counter()
+    async with session.post(url, data=orjson.dumps(payload), headers=HEADERS) as response:
+        if response.status != 200:
+            return response.status, None, None, None
+        text, first_token, prompt_tokens = await read_stream(response, extract, started)
+    
+    ollama_cache.store(payload, {"text": text})
+    return 200, text, first_token, prompt_tokens
+
+async def ollama_generate(session: aiohttp.ClientSession, model: str, prompt: str, **options):
+    """Streamed /api/generate call; returns the same tuple as stream_request"""
+    return await stream_request(
+        session,
+        urls.OLLAMA_GENERATE,
+        {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "options": {**DETERMINISTIC_OPTIONS, **options}
+        },
+        lambda c: c.get('response', '')
+    )
+
+async def warm_up_models(session: aiohttp.ClientSession, models=USED_MODELS):
+    """Load models up to OLLAMA_PARALLEL at a time so load time isn't counted against the tests"""
+    log(f"\n🔥 Warming up {len(models)} models...")
+    started = time.perf_counter()
+    
+    async def load(model):
+        # An empty prompt just loads the model and keeps it resident
+        async with session.post(
+            urls.OLLAMA_GENERATE,
+            data=orjson.dumps({"model": model, "prompt": "", "keep_alive": KEEP_ALIVE}),
+            headers=HEADERS
+        ) as response:
+            await response.read()
+            return response.status
+    
+    # Same cap as the tests: loading more models at once than Ollama serves just swaps them through VRAM
+    statuses = await gather_bounded(*(load(model) for model in models), return_exceptions=True)
+    for model, status in zip(models, statuses):
+        if status != 200:
+            log(f"   ⚠️  {model} did not load: {status}")
+    log(f"   Warmup took {time.perf_counter() - started:.1f}s")
+
+async def test_ollama_direct(session: aiohttp.ClientSession):
     """Test direct Ollama API connection"""
-    print("🔍 Testing Direct Ollama Connection...")
+    log("🔍 Testing Direct Ollama Connection...")
     
-    async with aiohttp.ClientSession() as session:
-        # Test if Ollama is running
-        try:
-            async with session.get("http://localhost:11434/api/tags") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print("✅ Ollama is running!")
-                    print(f"   Found {len(data.get('models', []))} models")
-                    for model in data.get('models', [])[:5]:
-                        print(f"   - {model['name']}: {model['size'] / 1e9:.1f}GB")
-                else:
-                    print("❌ Ollama API not responding")
-                    return False
-        except Exception as e:
-            print(f"❌ Could not connect to Ollama: {e}")
-            return False
+    # Test if Ollama is running
+    try:
+        async with session.get(urls.OLLAMA_TAGS) as response:
+            if response.status == 200:
+                data = await response.json()
+                log("✅ Ollama is running!")
+                log(f"   Found {len(data.get('models', []))} models")
+                for model in data.get('models', [])[:5]:
+                    log(f"   - {model['name']}: {model['size'] / 1e9:.1f}GB")
+            else:
+                log("❌ Ollama API not responding")
+                return False
+    except Exception as e:
+        log(f"❌ Could not connect to Ollama: {e}")
+        return False
     
     return True
 
-async def test_model_generation(model: str = "llama3.2:3b"):
+async def test_model_generation(session: aiohttp.ClientSession, model: str = "llama3.2:3b"):
     """Test text generation with a specific model"""
-    print(f"\n📝 Testing Text Generation with {model}...")
+    log(f"\n📝 Testing Text Generation with {model}...")
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            prompt = "Write a haiku about artificial intelligence"
-            
-            async with session.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "num_predict": 100
-                    }
-                }
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"✅ Generation successful!")
-                    print(f"\nPrompt: {prompt}")
-                    print(f"Response: {data.get('response', 'No response')}")
-                    return True
-                else:
-                    print(f"❌ Generation failed: {response.status}")
-                    return False
-        except Exception as e:
-            print(f"❌ Error during generation: {e}")
+    try:
+        prompt = "Write a haiku about artificial intelligence"
+        
+        status, text, first_token, prompt_tokens = await ollama_generate(
+            session, model, prompt, num_predict=100
+        )
+        if status == 200:
+            log(f"✅ Generation successful! (first token after {first_token or 0:.2f}s)")
+            log(f"\nPrompt: {prompt}")
+            log(f"Response: {text or 'No response'}")
+            return True
+        else:
+            log(f"❌ Generation failed: {status}")
             return False
+    except Exception as e:
+        log(f"❌ Error during generation: {e}")
+        return False
 
-async def test_chat_completion(model: str = "mistral:7b-instruct"):
+async def test_chat_completion(session: aiohttp.ClientSession, model: str = "mistral:7b-instruct"):
     """Test chat completion"""
-    print(f"\n💬 Testing Chat with {model}...")
+    log(f"\n💬 Testing Chat with {model}...")
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            messages = [
-                {"role": "system", "content": "You are a helpful coding assistant."},
-                {"role": "user", "content": "What's the best way to handle errors in Python?"}
-            ]
-            
-            async with session.post(
-                "http://localhost:11434/api/chat",
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "stream": False
-                }
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print("✅ Chat successful!")
-                    print(f"Response: {data.get('message', {}).get('content', 'No response')[:200]}...")
-                    return True
-                else:
-                    print(f"❌ Chat failed: {response.status}")
-                    return False
-        except Exception as e:
-            print(f"❌ Error during chat: {e}")
+    try:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": "What's the best way to handle errors in Python?"}
+        ]
+        
+        status, text, first_token, prompt_tokens = await stream_request(
+            session,
+            urls.OLLAMA_CHAT,
+            {
+                "model": model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": KEEP_ALIVE,
+                "options": DETERMINISTIC_OPTIONS
+            },
+            lambda c: c.get('message', {}).get('content', '')
+        )
+        if status == 200:
+            log(f"✅ Chat successful! (first token after {first_token or 0:.2f}s, {prompt_tokens} prompt tokens evaluated)")
+            log(f"Response: {(text or 'No response')[:200]}...")
+            return True
+        else:
+            log(f"❌ Chat failed: {status}")
             return False
+    except Exception as e:
+        log(f"❌ Error during chat: {e}")
+        return False
 
-async def test_code_generation(model: str = "deepseek-coder:6.7b-instruct"):
+async def test_code_generation(session: aiohttp.ClientSession, model: str = "deepseek-coder:6.7b-instruct"):
     """Test code generation with DeepSeek Coder"""
-    print(f"\n🖥️ Testing Code Generation with {model}...")
+    log(f"\n🖥️ Testing Code Generation with {model}...")
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            prompt = """Write a Python function that:
+    try:
+        prompt = CODE_INSTRUCTIONS + """Write a Python function that:
 1. Takes a list of numbers
 2. Returns the mean, median, and mode
-3. Handles edge cases
-
-Include docstring and type hints."""
-            
-            async with session.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "num_predict": 500
-                    }
-                }
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print("✅ Code generation successful!")
-                    print(f"\nGenerated code:\n{data.get('response', 'No response')[:500]}")
-                    return True
-                else:
-                    print(f"❌ Code generation failed: {response.status}")
-                    return False
-        except Exception as e:
-            print(f"❌ Error during code generation: {e}")
+3. Handles edge cases"""
+        
+        status, text, first_token, prompt_tokens = await ollama_generate(
+            session, model, prompt, num_predict=500
+        )
+        if status == 200:
+            log(f"✅ Code generation successful! (first token after {first_token or 0:.2f}s, {prompt_tokens} prompt tokens evaluated)")
+            log(f"\nGenerated code:\n{(text or 'No response')[:500]}")
+            return True
+        else:
+            log(f"❌ Code generation failed: {status}")
             return False
+    except Exception as e:
+        log(f"❌ Error during code generation: {e}")
+        return False
 
-async def test_local_llm_server():
+async def test_local_llm_server(session: aiohttp.ClientSession):
     """Test the local LLM server we created"""
-    print("\n🤖 Testing Local LLM Server Integration...")
+    log("\n🤖 Testing Local LLM Server Integration...")
     
     server_running = False
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get("http://localhost:8005") as response:
-                if response.status == 200:
-                    server_running = True
-                    print("✅ Local LLM Server is running!")
-        except:
-            print("⚠️  Local LLM Server not running (start with: python multimedia/local_llm_server.py)")
+    try:
+        async with session.get(urls.LLM_SERVER) as response:
+            if response.status == 200:
+                server_running = True
+                log("✅ Local LLM Server is running!")
+    except:
+        log("⚠️  Local LLM Server not running (start with: python multimedia/local_llm_server.py)")
     
     if server_running:
         # Test chat endpoint
         try:
             async with session.post(
-                "http://localhost:8005/api/chat",
-                json={
+                urls.LLM_SERVER_CHAT,
+                data=orjson.dumps({
                     "model": "llama3.1:8b",
                     "messages": [
                         {"role": "user", "content": "Hello, can you help me?"}
                     ]
-                }
+                }),
+                headers=HEADERS
             ) as response:
                 if response.status == 200:
                     data = await response.json()
-                    print("✅ Server chat endpoint working!")
-                    print(f"   Response: {data.get('response', '')[:100]}...")
+                    log("✅ Server chat endpoint working!")
+                    log(f"   Response: {data.get('response', '')[:100]}...")
         except Exception as e:
-            print(f"❌ Server chat test failed: {e}")
+            log(f"❌ Server chat test failed: {e}")
 
 async def main():
+    """Run all tests with buffered output"""
+    writer = start_log_writer()
+    try:
+        await run_suite()
+    finally:
+        await stop_log_writer(writer)
+
+async def run_suite():
     """Run all tests"""
-    print("=" * 60)
-    print("🧪 OLLAMA INTEGRATION TEST SUITE")
-    print("=" * 60)
-    
-    # Test Ollama connection
-    ollama_ok = await test_ollama_direct()
+    log("=" * 60)
+    log("🧪 OLLAMA INTEGRATION TEST SUITE")
+    log("=" * 60)
     
-    if ollama_ok:
-        # Test different models for different tasks
-        await test_model_generation("llama3.2:3b")  # Small, fast model
-        await test_chat_completion("mistral:7b-instruct")  # Good for chat
-        await test_code_generation("deepseek-coder:6.7b-instruct")  # Specialized for code
-        
-        # Test local server if running
-        await test_local_llm_server()
+    # One session for the whole run so every test reuses pooled keep-alive connections
+    async with aiohttp.ClientSession(connector=new_connector(), timeout=SESSION_TIMEOUT) as session:
+        pinger = asyncio.create_task(keepalive_pinger(session))
+        try:
+            # Test Ollama connection
+            ollama_ok = await test_ollama_direct(session)
+            
+            if ollama_ok:
+                await warm_up_models(session)
+                
+                # Test different models for different tasks, as many at once as Ollama serves in parallel
+                await gather_bounded(
+                    test_model_generation(session, GENERATION_MODEL),
+                    test_chat_completion(session, CHAT_MODEL),
+                    test_code_generation(session, CODE_MODEL)
+                )
+                
+                # Test local server if running
+                await test_local_llm_server(session)
+        finally:
+            pinger.cancel()
     
-    print("\n" + "=" * 60)
-    print("✅ Testing complete!")
-    print("\n📚 Your available models for different tasks:")
-    print("  - General purpose: llama3.1:8b, mistral:7b-instruct")
-    print("  - Code generation: deepseek-coder:6.7b-instruct")
-    print("  - Fast responses: llama3.2:3b, phi3:mini")
-    print("  - Advanced tasks: gpt-oss:20b")
-    print("\n🚀 Start the LLM server with:")
-    print("  cd multimedia && python local_llm_server.py")
-    print("=" * 60)
+    log("\n" + "=" * 60)
+    log("✅ Testing complete!")
+    log("\n📚 Your available models for different tasks:")
+    log("  - General purpose: llama3.1:8b, mistral:7b-instruct")
+    log("  - Code generation: deepseek-coder:6.7b-instruct")
+    log("  - Fast responses: llama3.2:3b, phi3:mini")
+    log("  - Advanced tasks: gpt-oss:20b")
+    log("\n🚀 Start the LLM server with:")
+    log("  cd multimedia && python local_llm_server.py")
+    log("=" * 60)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--no-cache", action="store_true", help="Always query Ollama instead of the response cache")
+    ollama_cache.ENABLED = not parser.parse_args().no_cache
+    try:
+        asyncio.run(main())
+    finally:
+        ollama_cache.flush()
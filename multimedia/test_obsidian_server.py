@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Regression tests for Obsidian Management Server vault scans
+
+Run with pytest; needs fastapi's TestClient (httpx) and the server's own dependencies.
+"""
+
+import pytest
+
+pytest.importorskip("fastapi.testclient")
+from fastapi.testclient import TestClient
+
+import obsidian_server
+
+NOTES = {
+    "empty-tags.md": "---\ntitle: Empty\ntags:\n---\nLinks to [[Single]].\n",
+    "single.md": "---\ntags: solo\n---\nOne bare-string tag.\n",
+    "listed.md": "---\ntags: [alpha, beta]\n---\nNo links here.\n",
+}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Server pointed at a throwaway vault and index"""
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for name, text in NOTES.items():
+        (vault / name).write_text(text)
+    monkeypatch.setattr(obsidian_server, "OBSIDIAN_VAULT_PATH", str(vault))
+    monkeypatch.setattr(obsidian_server, "INDEX_DIR", tmp_path / "index")
+    monkeypatch.setattr(obsidian_server, "INDEX_DB", tmp_path / "index" / "index.db")
+    with TestClient(obsidian_server.app) as client:
+        yield client
+
+def test_normalize_tags():
+    assert obsidian_server.normalize_tags(None) == []
+    assert obsidian_server.normalize_tags("solo") == ["solo"]
+    assert obsidian_server.normalize_tags(["a", "b"]) == ["a", "b"]
+    assert obsidian_server.normalize_tags({"a": 1}) == []
+
+def test_empty_tags_key_does_not_break_vault_scans(client):
+    """A note with an empty `tags:` key used to fail /api/stats and /api/graph/generate for the whole vault"""
+    response = client.get("/api/stats")
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert stats["total_notes"] == len(NOTES)
+    assert sorted(stats["total_tags"]) == ["alpha", "beta", "solo"]
+
+    response = client.post("/api/graph/generate", json={})
+    assert response.status_code == 200, response.text
+
+    response = client.post("/api/notes/search", json={"query": "solo", "search_type": "tags"})
+    assert response.status_code == 200, response.text
+    assert [result["title"] for result in response.json()["results"]] == ["single"]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Logging, concurrency and connection helpers shared by the integration test scripts
+"""
+
+import os
+import sys
+import asyncio
+import aiohttp
+
+import service_urls as urls
+
+# Pooled sockets stay open this long between requests; the pinger keeps Ollama's busy
+KEEPALIVE_TIMEOUT = 120
+KEEPALIVE_PING_INTERVAL = 30
+
+# Generations in flight against Ollama at once; more than it serves in parallel just swaps models
+OLLAMA_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "2"))
+
+# Lines queued by log() are written in batches of up to LOG_BATCH per syscall
+LOG_BATCH = 32
+_log_queue = None
+
+def log(message: str = ""):
+    """Queue a line for the log writer, or print it directly when no writer is running"""
+    if _log_queue is None:
+        print(message)
+    else:
+        _log_queue.put_nowait(message + "\n")
+
+async def _write_log(queue: asyncio.Queue):
+    """Drain queued lines, writing whatever has accumulated in one call"""
+    while True:
+        lines = [await queue.get()]
+        while len(lines) < LOG_BATCH and not queue.empty():
+            lines.append(queue.get_nowait())
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
+
+def start_log_writer() -> asyncio.Task:
+    """Route log() through a queue drained by a background writer task"""
+    global _log_queue
+    _log_queue = asyncio.Queue()
+    return asyncio.create_task(_write_log(_log_queue))
+
+async def stop_log_writer(writer: asyncio.Task):
+    """Stop the writer and flush any lines still queued"""
+    global _log_queue
+    queue, _log_queue = _log_queue, None
+    writer.cancel()
+    try:
+        await writer
+    except asyncio.CancelledError:
+        pass
+    # Whatever the writer hadn't picked up yet
+    lines = []
+    while not queue.empty():
+        lines.append(queue.get_nowait())
+    sys.stdout.write("".join(lines))
+    sys.stdout.flush()
+
+async def gather_bounded(*coros, limit: int = OLLAMA_PARALLEL, return_exceptions: bool = False):
+    """asyncio.gather with at most limit coroutines running; if one raises, the rest are cancelled"""
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+    
+    tasks = [asyncio.ensure_future(bounded(coro)) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def new_connector() -> aiohttp.TCPConnector:
+    """Connection pool shared by every test in a run"""
+    # Long idle gaps happen while slow generations run; keep sockets around for the next phase
+    return aiohttp.TCPConnector(
+        limit=64, limit_per_host=32, ttl_dns_cache=300,
+        keepalive_timeout=KEEPALIVE_TIMEOUT, enable_cleanup_closed=True
+    )
+
+async def keepalive_pinger(session: aiohttp.ClientSession, interval: float = KEEPALIVE_PING_INTERVAL):
+    """Hit the cheap /api/tags endpoint periodically so the Ollama connection never goes cold"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session.get(urls.OLLAMA_TAGS) as response:
+                await response.read()
+        except aiohttp.ClientError:
+            pass
@@ -2,92 +2,172 @@
 """
 Test Video Generation Capabilities
 Tests all video generation workflows with your installed models
+
+Runs on uvloop when it is installed (recommended for CI); falls back to asyncio's default loop.
 """
 
 import asyncio
 import aiohttp
 import json
-import os
+import argparse
+import tempfile
+import orjson
 from pathlib import Path
+from functools import lru_cache
+
+import ollama_cache
+import service_urls as urls
+from test_support import (
+    log, start_log_writer, stop_log_writer, gather_bounded, new_connector, keepalive_pinger
+)
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+HEADERS = {"Content-Type": "application/json"}
+
+# Fixed seed and greedy decoding make replies reproducible, so they can be cached and compared
+DETERMINISTIC_OPTIONS = {"seed": 42, "temperature": 0}
 
-# Service endpoints
-SERVICES = {
-    "video_gen": "http://localhost:8006",
-    "workflows": "http://localhost:8007",
-    "ollama": "http://localhost:11434"
+# Keep models resident across the whole run instead of reloading between tests
+KEEP_ALIVE = "30m"
+
+# Request bodies are fixed, so build and encode them once at import
+VISION_REQUEST = {
+    "prompt": "Describe a beautiful sunset over mountains",
+    "stream": False,
+    "keep_alive": KEEP_ALIVE,
+    "options": {**DETERMINISTIC_OPTIONS, "num_predict": 50}
 }
 
-async def test_ollama_vision():
-    """Test Ollama vision models"""
-    print("\n🔍 Testing Ollama Vision Models...")
+TEXT_TO_VIDEO_PROMPTS = [
+    {
+        "prompt": "A serene lake with mountains reflected in the water, sunrise",
+        "style": "cinematic"
+    },
+    {
+        "prompt": "A robot dancing in a futuristic city",
+        "style": "anime"
+    },
+    {
+        "prompt": "Time-lapse of flowers blooming in a garden",
+        "style": "realistic"
+    }
+]
+TEXT_TO_VIDEO_BODIES = [
+    orjson.dumps({"prompt": test["prompt"], "style_preset": test["style"], "duration": 4, "fps": 8})
+    for test in TEXT_TO_VIDEO_PROMPTS
+]
+
+# Fail fast when a server is down; generations themselves may legitimately take minutes
+SESSION_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5)
+
+# Budget for "is this server up?" checks before committing to slow requests
+HEALTH_TIMEOUT = aiohttp.ClientTimeout(total=2)
+
+async def test_ollama_vision(session: aiohttp.ClientSession):
+    """Test Ollama vision models; returns the report lines"""
+    lines = ["\n🔍 Testing Ollama Vision Models..."]
     
     models_to_test = ["llava:7b", "bakllava:7b", "moondream:latest"]
     
+    # One /api/tags call tells us what's installed without spending GPU time
+    try:
+        async with session.get(urls.OLLAMA_TAGS) as response:
+            data = await response.json()
+        installed = {model["name"] for model in data.get("models", [])}
+    except Exception as e:
+        lines.append(f"  ❌ Could not list Ollama models: {str(e)}")
+        return lines
+    
     for model in models_to_test:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{SERVICES['ollama']}/api/generate",
-                    json={
-                        "model": model,
-                        "prompt": "Describe a beautiful sunset over mountains",
-                        "stream": False,
-                        "options": {"num_predict": 50}
-                    }
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        print(f"  ✅ {model}: {result.get('response', '')[:100]}...")
-                    else:
-                        print(f"  ❌ {model}: Failed")
-        except Exception as e:
-            print(f"  ❌ {model}: {str(e)}")
-
-async def test_text_to_video():
-    """Test text to video generation"""
-    print("\n🎬 Testing Text-to-Video Generation...")
-    
-    prompts = [
-        {
-            "prompt": "A serene lake with mountains reflected in the water, sunrise",
-            "style": "cinematic"
-        },
-        {
-            "prompt": "A robot dancing in a futuristic city",
-            "style": "anime"
-        },
-        {
-            "prompt": "Time-lapse of flowers blooming in a garden",
-            "style": "realistic"
-        }
-    ]
-    
-    for test in prompts:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{SERVICES['workflows']}/api/workflow/text_to_video",
-                    json={
-                        "prompt": test["prompt"],
-                        "style_preset": test["style"],
-                        "duration": 4,
-                        "fps": 8
-                    }
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        print(f"  ✅ Generated: {test['prompt'][:50]}...")
-                        print(f"     Model: {result.get('model_used')}")
-                        print(f"     Path: {result.get('video_path')}")
-                    else:
-                        print(f"  ⚠️  Workflow server not running for: {test['prompt'][:50]}...")
-        except:
-            print(f"  ⚠️  Workflow server not available. Start with: python3 advanced_video_workflows.py")
-            break
-
-async def test_story_to_video():
-    """Test story to video conversion"""
-    print("\n📖 Testing Story-to-Video...")
+        if model not in installed:
+            lines.append(f"  ⚠️  {model}: not installed")
+    available = [model for model in models_to_test if model in installed]
+    
+    # Probe installed models concurrently, up to what Ollama serves in parallel
+    results = await gather_bounded(
+        *(_probe_vision_model(session, model) for model in available),
+        return_exceptions=True
+    )
+    for model, result in zip(available, results):
+        if isinstance(result, Exception):
+            lines.append(f"  ❌ {model}: {str(result)}")
+        elif result is None:
+            lines.append(f"  ❌ {model}: Failed")
+        else:
+            lines.append(f"  ✅ {model}: {result.get('response', '')[:100]}...")
+    
+    return lines
+
+@lru_cache(maxsize=None)
+def _vision_payload(model: str):
+    """(payload dict, encoded body) for probing model"""
+    payload = {"model": model, **VISION_REQUEST}
+    return payload, orjson.dumps(payload)
+
+async def _probe_vision_model(session: aiohttp.ClientSession, model: str):
+    """Single generate request against a vision model; None on a non-200 reply"""
+    payload, body = _vision_payload(model)
+    cached = ollama_cache.load(payload)
+    if cached is not None:
+        return cached
+    
+    async with session.post(
+        urls.OLLAMA_GENERATE, data=body, headers=HEADERS
+    ) as response:
+        if response.status != 200:
+            return None
+        result = orjson.loads(await response.read())
+    ollama_cache.store(payload, result)
+    return result
+
+async def test_text_to_video(session: aiohttp.ClientSession):
+    """Test text to video generation; returns the report lines"""
+    lines = ["\n🎬 Testing Text-to-Video Generation..."]
+    
+    # One cheap request decides whether the generations are worth sending at all
+    try:
+        async with session.get(urls.WORKFLOWS, timeout=HEALTH_TIMEOUT) as response:
+            healthy = response.status == 200
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        healthy = False
+    if not healthy:
+        lines.append("  ⚠️  Workflow server not available. Start with: python3 advanced_video_workflows.py")
+        return lines
+    
+    results = await asyncio.gather(
+        *(_generate_video(session, body) for body in TEXT_TO_VIDEO_BODIES),
+        return_exceptions=True
+    )
+    
+    for test, result in zip(TEXT_TO_VIDEO_PROMPTS, results):
+        if isinstance(result, Exception):
+            lines.append(f"  ❌ Failed: {test['prompt'][:50]}... ({result})")
+        elif result is not None:
+            lines.append(f"  ✅ Generated: {test['prompt'][:50]}...")
+            lines.append(f"     Model: {result.get('model_used')}")
+            lines.append(f"     Path: {result.get('video_path')}")
+        else:
+            lines.append(f"  ⚠️  Workflow server not running for: {test['prompt'][:50]}...")
+    
+    return lines
+
+async def _generate_video(session: aiohttp.ClientSession, body: bytes):
+    """Single text-to-video request from a pre-encoded body; None on a non-200 reply"""
+    async with session.post(
+        urls.WORKFLOW_TEXT_TO_VIDEO, data=body, headers=HEADERS
+    ) as response:
+        if response.status == 200:
+            return await response.json()
+        return None
+
+async def test_story_to_video(session: aiohttp.ClientSession):
+    """Test story to video conversion; returns the report lines"""
+    lines = ["\n📖 Testing Story-to-Video..."]
     
     story = """
     Once upon a time, in a magical forest, a young deer discovered a glowing crystal.
@@ -96,130 +176,188 @@ async def test_story_to_video():
     """
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{SERVICES['workflows']}/api/workflow/story_to_video",
-                json={
-                    "story": story,
-                    "style": "fantasy",
-                    "duration": 10,
-                    "include_narration": True,
-                    "include_music": True
-                }
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"  ✅ Story converted to video")
-                    print(f"     Scenes: {result.get('scenes')}")
-                    print(f"     Workflow ID: {result.get('workflow_id')}")
-                else:
-                    print("  ⚠️  Story workflow not available")
+        async with session.post(
+            urls.WORKFLOW_STORY_TO_VIDEO,
+            data=orjson.dumps({
+                "story": story,
+                "style": "fantasy",
+                "duration": 10,
+                "include_narration": True,
+                "include_music": True
+            }),
+            headers=HEADERS
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                lines.append(f"  ✅ Story converted to video")
+                lines.append(f"     Scenes: {result.get('scenes')}")
+                lines.append(f"     Workflow ID: {result.get('workflow_id')}")
+            else:
+                lines.append("  ⚠️  Story workflow not available")
     except:
-        print("  ⚠️  Workflow server not running")
+        lines.append("  ⚠️  Workflow server not running")
+    
+    return lines
+
+# Odd on both axes; yuv420p output needs even dimensions, so the server has to pad
+ODD_FRAME_SIZE = (101, 75)
+
+async def test_odd_size_encode(session: aiohttp.ClientSession):
+    """Encode an odd-sized image through image_to_video; returns the report lines"""
+    width, height = ODD_FRAME_SIZE
+    lines = [f"\n📐 Testing {width}x{height} Encode..."]
+    
+    # Binary PPM: cv2.imread reads it without any image library on this side
+    with tempfile.NamedTemporaryFile(suffix='.ppm', delete=False) as f:
+        f.write(b"P6 %d %d 255\n" % (width, height) + bytes([128]) * (width * height * 3))
+    try:
+        async with session.post(
+            urls.VIDEO_GEN_IMAGE_TO_VIDEO,
+            data=orjson.dumps({"image_path": f.name, "duration": 1, "fps": 8, "motion_type": "zoom_in"}),
+            headers=HEADERS
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                lines.append(f"  ✅ Encoded: {result['video_path']}")
+                Path(result['video_path']).unlink(missing_ok=True)
+            else:
+                lines.append(f"  ❌ Encoding failed: {(await response.text())[:200]}")
+    except aiohttp.ClientError:
+        lines.append("  ⚠️  Video generation server not running")
+    finally:
+        Path(f.name).unlink(missing_ok=True)
+    
+    return lines
 
-async def test_model_availability():
-    """Check which models are available"""
-    print("\n📦 Checking Model Availability...")
+async def test_model_availability(session: aiohttp.ClientSession):
+    """Check which models are available; returns the report lines"""
+    lines = ["\n📦 Checking Model Availability..."]
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{SERVICES['video_gen']}/api/models/list"
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    models = data.get("models", {})
-                    
-                    print("\n  Video Models:")
-                    for name, info in models.items():
-                        if info["type"] == "video":
-                            status = "✅" if info["installed"] else "❌"
-                            print(f"    {status} {name}: {info['config']['description']}")
-                    
-                    print("\n  Image Models:")
-                    for name, info in models.items():
-                        if info["type"] == "image":
-                            status = "✅" if info["installed"] else "❌"
-                            print(f"    {status} {name}: {info['config']['description']}")
-                    
-                    print("\n  Recommendations:")
-                    recs = data.get("recommendations", {})
-                    for key, value in recs.items():
-                        print(f"    {key}: {value}")
-                else:
-                    print("  ❌ Video generation server not running")
+        async with session.get(urls.VIDEO_GEN_MODELS) as response:
+            if response.status == 200:
+                data = await response.json()
+                models = data.get("models", {})
+                
+                # Single pass that partitions rows by model type
+                by_type = {"video": [], "image": []}
+                for name, info in models.items():
+                    by_type.setdefault(info["type"], []).append(
+                        ("✅" if info["installed"] else "❌", name, info["config"]["description"])
+                    )
+                
+                lines.append("\n  Video Models:")
+                for status, name, description in by_type["video"]:
+                    lines.append(f"    {status} {name}: {description}")
+                
+                lines.append("\n  Image Models:")
+                for status, name, description in by_type["image"]:
+                    lines.append(f"    {status} {name}: {description}")
+                
+                lines.append("\n  Recommendations:")
+                recs = data.get("recommendations", {})
+                for key, value in recs.items():
+                    lines.append(f"    {key}: {value}")
+            else:
+                lines.append("  ❌ Video generation server not running")
     except:
-        print("  ❌ Video generation server not available")
-        print("     Start with: python3 video_generation_server.py")
+        lines.append("  ❌ Video generation server not available")
+        lines.append("     Start with: python3 video_generation_server.py")
+    
+    return lines
 
-async def test_capabilities():
-    """Test workflow capabilities"""
-    print("\n🎯 Testing Workflow Capabilities...")
+async def test_capabilities(session: aiohttp.ClientSession):
+    """Test workflow capabilities; returns the report lines"""
+    lines = ["\n🎯 Testing Workflow Capabilities..."]
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{SERVICES['workflows']}/api/workflow/capabilities"
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    print("\n  Vision Models Available:")
-                    for model in data.get("vision_models", []):
-                        print(f"    ✅ {model['name']} ({model['size']})")
-                    
-                    print("\n  Video Models Ready:")
-                    for model in data.get("video_models", []):
-                        print(f"    ✅ {model}")
-                    
-                    print("\n  Workflows Available:")
-                    for workflow in data.get("workflows", []):
-                        print(f"    • {workflow['name']}: {workflow['description']}")
-                else:
-                    print("  ❌ Workflow server not responding")
+        async with session.get(urls.WORKFLOW_CAPABILITIES) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                lines.append("\n  Vision Models Available:")
+                for model in data.get("vision_models", []):
+                    lines.append(f"    ✅ {model['name']} ({model['size']})")
+                
+                lines.append("\n  Video Models Ready:")
+                for model in data.get("video_models", []):
+                    lines.append(f"    ✅ {model}")
+                
+                lines.append("\n  Workflows Available:")
+                for workflow in data.get("workflows", []):
+                    lines.append(f"    • {workflow['name']}: {workflow['description']}")
+            else:
+                lines.append("  ❌ Workflow server not responding")
     except:
-        print("  ❌ Workflow server not available")
+        lines.append("  ❌ Workflow server not available")
+    
+    return lines
 
 async def main():
+    """Run all tests with buffered output"""
+    writer = start_log_writer()
+    try:
+        await run_suite()
+    finally:
+        await stop_log_writer(writer)
+
+async def run_suite():
     """Run all tests"""
-    print("=" * 60)
-    print("🎬 VIDEO GENERATION TEST SUITE")
-    print("=" * 60)
-    
-    # Test Ollama vision models
-    await test_ollama_vision()
-    
-    # Check model availability
-    await test_model_availability()
-    
-    # Test workflows
-    await test_capabilities()
-    
-    # Test video generation
-    await test_text_to_video()
-    
-    # Test story conversion
-    await test_story_to_video()
-    
-    print("\n" + "=" * 60)
-    print("✅ Testing Complete!")
-    print("\n📝 Quick Start Guide:")
-    print("  1. Start video generation server:")
-    print("     python3 video_generation_server.py")
-    print("")
-    print("  2. Start workflow server:")
-    print("     python3 advanced_video_workflows.py")
-    print("")
-    print("  3. Generate a video:")
-    print("     curl -X POST http://localhost:8007/api/workflow/text_to_video \\")
-    print("       -H 'Content-Type: application/json' \\")
-    print("       -d '{\"prompt\": \"A beautiful sunset\", \"style_preset\": \"cinematic\"}'")
-    print("")
-    print("  4. Convert story to video:")
-    print("     curl -X POST http://localhost:8007/api/workflow/story_to_video \\")
-    print("       -H 'Content-Type: application/json' \\")
-    print("       -d '{\"story\": \"Your story here\", \"style\": \"fantasy\"}'")
-    print("=" * 60)
+    log("=" * 60)
+    log("🎬 VIDEO GENERATION TEST SUITE")
+    log("=" * 60)
+    
+    # One session for the whole run so every test reuses pooled keep-alive connections
+    async with aiohttp.ClientSession(connector=new_connector(), timeout=SESSION_TIMEOUT) as session:
+        pinger = asyncio.create_task(keepalive_pinger(session))
+        try:
+            # Vision and capability probes are independent of everything else, so start them now
+            availability = asyncio.create_task(test_model_availability(session))
+            capabilities = asyncio.create_task(test_capabilities(session))
+            vision = asyncio.create_task(test_ollama_vision(session))
+            
+            # Video generation needs the model check first; the probes finish behind it.
+            # Each phase returns its lines so the blocks print whole and in a fixed order.
+            for line in await availability:
+                log(line)
+            blocks = await asyncio.gather(
+                test_text_to_video(session),
+                test_story_to_video(session),
+                test_odd_size_encode(session),
+                capabilities,
+                vision
+            )
+            for block in blocks:
+                for line in block:
+                    log(line)
+        finally:
+            pinger.cancel()
+    
+    log("\n" + "=" * 60)
+    log("✅ Testing Complete!")
+    log("\n📝 Quick Start Guide:")
+    log("  1. Start video generation server:")
+    log("     python3 video_generation_server.py")
+    log("")
+    log("  2. Start workflow server:")
+    log("     python3 advanced_video_workflows.py")
+    log("")
+    log("  3. Generate a video:")
+    log(f"     curl -X POST {urls.WORKFLOW_TEXT_TO_VIDEO} \\")
+    log("       -H 'Content-Type: application/json' \\")
+    log("       -d '{\"prompt\": \"A beautiful sunset\", \"style_preset\": \"cinematic\"}'")
+    log("")
+    log("  4. Convert story to video:")
+    log(f"     curl -X POST {urls.WORKFLOW_STORY_TO_VIDEO} \\")
+    log("       -H 'Content-Type: application/json' \\")
+    log("       -d '{\"story\": \"Your story here\", \"style\": \"fantasy\"}'")
+    log("=" * 60)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--no-cache", action="store_true", help="Always query Ollama instead of the response cache")
+    ollama_cache.ENABLED = not parser.parse_args().no_cache
+    try:
+        asyncio.run(main())
+    finally:
+        ollama_cache.flush()
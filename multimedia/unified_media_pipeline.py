@@ -4,24 +4,30 @@ Unified Media Pipeline - Orchestrates image, audio, and video generation from na
 """
 
 import os
-import json
+import time
 import asyncio
+import zlib
+import struct
+import hashlib
+import threading
 import aiohttp
-import subprocess
+import orjson
 import tempfile
+from copy import copy
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache
 import base64
-from PIL import Image
-import io
+import string
 
 from fastapi import FastAPI, HTTPException, File, UploadFile, BackgroundTasks
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 
-app = FastAPI(title="Unified Media Pipeline", version="1.0.0")
+app = FastAPI(title="Unified Media Pipeline", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Service endpoints
 SERVICES = {
@@ -32,6 +38,126 @@ SERVICES = {
     "sdwebui": "http://localhost:7860"
 }
 
+# Outbound calls share one pooled session so keep-alive connections are reused
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=5)
+STATUS_TIMEOUT = aiohttp.ClientTimeout(total=2)
+
+# Service status is reused for STATUS_TTL seconds so dashboards polling it don't hammer backends
+STATUS_TTL = 3.0
+status_cache = {"timestamp": 0.0, "status": None}
+
+@app.on_event("startup")
+async def open_http_session():
+    app.state.http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=10, enable_cleanup_closed=True),
+        timeout=HTTP_TIMEOUT,
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    )
+
+@app.on_event("shutdown")
+async def close_http_session():
+    await app.state.http_session.close()
+
+async def get_session() -> aiohttp.ClientSession:
+    """Shared client session opened at startup"""
+    return app.state.http_session
+
+# Jobs allowed in flight per backend; extra requests wait here instead of piling onto the GPU
+COMFYUI_CONCURRENCY = int(os.environ.get("COMFY_CONCURRENCY", "4"))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "4"))
+MUSIC_CONCURRENCY = int(os.environ.get("MUSIC_CONCURRENCY", "2"))
+
+@app.on_event("startup")
+async def create_backend_limits():
+    app.state.comfyui_slots = asyncio.Semaphore(COMFYUI_CONCURRENCY)
+    app.state.tts_slots = asyncio.Semaphore(TTS_CONCURRENCY)
+    app.state.music_slots = asyncio.Semaphore(MUSIC_CONCURRENCY)
+
+# Backend responses are copied to disk in chunks of this size rather than read whole
+DOWNLOAD_CHUNK = 1 << 16
+
+def new_temp_path(suffix: str) -> str:
+    """Reserve an empty temp file for a subprocess to write, without keeping a handle open"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+async def download_to_tempfile(response: aiohttp.ClientResponse, suffix: str) -> str:
+    """Stream a response body into a new temp file and return its path"""
+    # File creation can stall on a busy disk, so it happens off the event loop
+    path = await asyncio.get_running_loop().run_in_executor(None, new_temp_path, suffix)
+    with open(path, 'wb') as temp_file:
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK):
+            temp_file.write(chunk)
+    return path
+
+# ComfyUI writes results here; history entries give paths relative to it
+COMFYUI_OUTPUT_DIR = Path(os.environ.get("COMFYUI_OUTPUT_DIR", "~/ComfyUI/output")).expanduser()
+COMFYUI_JOB_TIMEOUT = 300  # Seconds to wait for a queued prompt
+
+# Generated assets keyed by the request fields that determine them, most recently used last
+ASSET_CACHE_SIZE = 1024
+ASSET_CACHE_TTL = int(os.environ.get("ASSET_CACHE_TTL", 3600))
+_ASSET_CACHE: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created, path)
+
+def asset_key(*parts) -> str:
+    """Cache key for a generation request"""
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+def cached_asset(key: str) -> Optional[str]:
+    """Path of a fresh cached asset that still exists on disk, if any"""
+    entry = _ASSET_CACHE.get(key)
+    if entry is None:
+        return None
+    created, path = entry
+    if time.time() - created > ASSET_CACHE_TTL or not os.path.exists(path):
+        del _ASSET_CACHE[key]
+        return None
+    _ASSET_CACHE.move_to_end(key)
+    return path
+
+def remember_asset(key: str, path: str):
+    """Record a generated asset, evicting the least recently used beyond ASSET_CACHE_SIZE"""
+    _ASSET_CACHE[key] = (time.time(), path)
+    _ASSET_CACHE.move_to_end(key)
+    while len(_ASSET_CACHE) > ASSET_CACHE_SIZE:
+        _ASSET_CACHE.popitem(last=False)
+
+# Audio jobs currently being generated, by asset key; identical concurrent requests share one
+_AUDIO_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+async def fetch_audio(key: str, endpoint: str, payload: Dict[str, Any], slots: asyncio.Semaphore) -> Optional[str]:
+    """Generate an audio asset on the audio server and cache it; None on a non-200 reply"""
+    pending = _AUDIO_INFLIGHT.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    
+    future = asyncio.get_running_loop().create_future()
+    _AUDIO_INFLIGHT[key] = future
+    try:
+        session = await get_session()
+        async with slots, session.post(f"{SERVICES['audio']}{endpoint}", json=payload) as response:
+            path = await download_to_tempfile(response, '.mp3') if response.status == 200 else None
+        if path:
+            remember_asset(key, path)
+        future.set_result(path)
+        return path
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved; waiters (if any) still receive it
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        del _AUDIO_INFLIGHT[key]
+
+def backoff_sequence(start: float = 0.1, cap: float = 2.0):
+    """Polling delays doubling from start up to cap"""
+    delay = start
+    while True:
+        yield delay
+        delay = min(delay * 2, cap)
+
 class MediaGenerationRequest(BaseModel):
     prompt: str
     media_type: str  # image, audio, video, multimedia
@@ -61,64 +187,182 @@ class WorkflowRequest(BaseModel):
     steps: List[Dict[str, Any]]
     input_data: Optional[Dict[str, Any]] = {}
 
-async def call_comfyui_api(workflow: dict, prompt: str) -> str:
+async def _submit_prompt(session: aiohttp.ClientSession, workflow_data: dict) -> str:
+    """Queue one workflow on ComfyUI and return its prompt id"""
+    async with session.post(
+        f"{SERVICES['comfyui']}/prompt",
+        json={"prompt": workflow_data}
+    ) as response:
+        # A rejected workflow comes back as a 400 with node errors and no prompt id
+        if response.status != 200:
+            raise RuntimeError(f"ComfyUI rejected the prompt ({response.status}): {(await response.text())[:500]}")
+        result = await response.json()
+    prompt_id = result.get("prompt_id")
+    if not prompt_id:
+        raise RuntimeError(f"ComfyUI returned no prompt id: {result}")
+    return prompt_id
+
+WORKFLOW_PATH = Path(__file__).parent / "comfyui_workflows.json"
+
+def _prompt_paths(node, path=()) -> List[tuple]:
+    """(key path, text around each [PROMPT]) for every string under node containing the placeholder"""
+    if isinstance(node, str):
+        return [(path, tuple(node.split("[PROMPT]")))] if "[PROMPT]" in node else []
+    if isinstance(node, dict):
+        items = node.items()
+    elif isinstance(node, list):
+        items = enumerate(node)
+    else:
+        return []
+    return [found for key, child in items for found in _prompt_paths(child, path + (key,))]
+
+@lru_cache(maxsize=1)
+def _load_workflows(mtime: float) -> Dict[str, tuple]:
+    """Workflows parsed once per file modification, each with its [PROMPT] paths"""
+    workflows = orjson.loads(WORKFLOW_PATH.read_bytes())
+    return {name: (workflow, _prompt_paths(workflow)) for name, workflow in workflows.items()}
+
+def load_workflow(name: str) -> Optional[tuple]:
+    """(workflow, prompt paths) for name; None when the workflow file is missing"""
+    try:
+        workflows = _load_workflows(WORKFLOW_PATH.stat().st_mtime)
+    except FileNotFoundError:
+        return None
+    return workflows.get(name, ({}, []))
+
+def fill_prompt(workflow: dict, prompt_paths: List[tuple], prompt: str) -> dict:
+    """Copy of workflow with prompt substituted; only containers on a prompt path are copied"""
+    filled = copy(workflow)
+    for path, parts in prompt_paths:
+        target, source = filled, workflow
+        for key in path[:-1]:
+            source = source[key]
+            if target[key] is source:
+                target[key] = copy(source)
+            target = target[key]
+        # A leaf that is exactly "[PROMPT]" splits into two empty parts and becomes the prompt itself
+        target[path[-1]] = prompt.join(parts)
+    return filled
+
+async def _run_comfyui_job(workflow_data: dict) -> str:
+    """Queue a filled workflow, wait for it to finish and return the output image path"""
+    # Queue the prompt; concurrent jobs already share the pooled session's connections
+    session = await get_session()
+    prompt_id = await _submit_prompt(session, workflow_data)
+    
+    # Poll history until the job finishes; short jobs return in well under a second.
+    # ComfyUI only writes a history entry once a prompt has finished, successfully or not.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + COMFYUI_JOB_TIMEOUT
+    for delay in backoff_sequence():
+        async with session.get(
+            f"{SERVICES['comfyui']}/history/{prompt_id}"
+        ) as response:
+            history = await response.json()
+        entry = history.get(prompt_id)
+        if entry:
+            break
+        if loop.time() + delay > deadline:
+            raise TimeoutError(f"ComfyUI prompt {prompt_id} did not finish")
+        await asyncio.sleep(delay)
+    
+    status = entry.get("status", {})
+    if status.get("status_str") == "error":
+        errors = [
+            data.get("exception_message", "")
+            for kind, data in status.get("messages", []) if kind == "execution_error"
+        ]
+        raise RuntimeError(f"ComfyUI prompt {prompt_id} failed: {'; '.join(errors) or 'execution error'}")
+    
+    # First image written by any output node
+    for output in entry.get("outputs", {}).values():
+        for image in output.get("images", []):
+            return str(COMFYUI_OUTPUT_DIR / image.get("subfolder", "") / image["filename"])
+    raise ValueError(f"ComfyUI prompt {prompt_id} produced no images")
+
+async def call_comfyui_api(workflow: dict, prompt: str, prompt_paths: Optional[List[tuple]] = None) -> str:
     """Call ComfyUI API to generate images"""
     try:
         # Prepare the workflow with the prompt
-        workflow_str = json.dumps(workflow).replace("[PROMPT]", prompt)
-        workflow_data = json.loads(workflow_str)
+        if prompt_paths is None:
+            prompt_paths = _prompt_paths(workflow)
+        workflow_data = fill_prompt(workflow, prompt_paths, prompt)
         
-        async with aiohttp.ClientSession() as session:
-            # Queue the prompt
-            async with session.post(
-                f"{SERVICES['comfyui']}/prompt",
-                json={"prompt": workflow_data}
-            ) as response:
-                result = await response.json()
-                prompt_id = result.get("prompt_id")
-            
-            # Wait for completion and get result
-            await asyncio.sleep(10)  # Give it time to process
-            
-            # Get the output (simplified - in production, poll for completion)
-            async with session.get(
-                f"{SERVICES['comfyui']}/history/{prompt_id}"
-            ) as response:
-                history = await response.json()
-                
-                # Extract image path from history
-                # This is simplified - actual implementation would parse properly
-                return f"/tmp/comfyui_output_{prompt_id}.png"
+        async with app.state.comfyui_slots:
+            return await _run_comfyui_job(workflow_data)
     
     except Exception as e:
         print(f"ComfyUI API error: {e}")
         # Fallback to creating a placeholder
         return create_placeholder_image(prompt)
 
+# Placeholders don't depend on the prompt, so each size/color is encoded and written once
+PLACEHOLDER_SIZE = (1024, 1024)
+PLACEHOLDER_COLOR = (0, 0, 255)  # Blue
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+@lru_cache(maxsize=8)
+def _placeholder_png(size: tuple, color: tuple) -> bytes:
+    """Solid-color RGB image encoded as PNG, compressed one scanline at a time"""
+    width, height = size
+    row = b"\x00" + bytes(color) * width  # Filter type 0, then the pixels
+    compressor = zlib.compressobj()
+    idat = b"".join(compressor.compress(row) for _ in range(height)) + compressor.flush()
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", idat)
+        + _png_chunk(b"IEND", b"")
+    )
+
 def create_placeholder_image(prompt: str) -> str:
     """Create a placeholder image when services are unavailable"""
-    img = Image.new('RGB', (1024, 1024), color='blue')
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-    img.save(temp_file.name)
-    return temp_file.name
+    key = hashlib.sha1(f"{PLACEHOLDER_SIZE}|{PLACEHOLDER_COLOR}".encode()).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), f"placeholder_{key}.png")
+    if not os.path.exists(path):
+        # Concurrent callers may race here; each writes its own file and the rename is atomic
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_placeholder_png(PLACEHOLDER_SIZE, PLACEHOLDER_COLOR))
+        os.replace(tmp, path)
+    return path
+
+async def create_placeholder_images(prompts: List[str]) -> List[str]:
+    """create_placeholder_image for each prompt, run concurrently in the default executor"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(None, create_placeholder_image, prompt) for prompt in prompts
+    ))
+
+def render_placeholder_png(prompt: str) -> bytes:
+    """Placeholder image encoded as PNG in memory, for piping straight into ffmpeg"""
+    return _placeholder_png(PLACEHOLDER_SIZE, PLACEHOLDER_COLOR)
 
 @app.post("/api/generate")
 async def generate_media(request: MediaGenerationRequest):
     """Generate media from natural language prompt"""
     try:
         results = {}
+        cached = False
         
         if request.media_type == "image":
-            # Load ComfyUI workflow
-            workflow_path = Path(__file__).parent / "comfyui_workflows.json"
-            if workflow_path.exists():
-                with open(workflow_path, 'r') as f:
-                    workflows = json.load(f)
-                
-                workflow = workflows.get("text_to_image_workflow", {})
-                image_path = await call_comfyui_api(workflow, request.prompt)
-            else:
-                image_path = create_placeholder_image(request.prompt)
+            key = asset_key("image", request.prompt, "text_to_image_workflow", request.resolution, request.style)
+            image_path = cached_asset(key)
+            cached = image_path is not None
+            
+            if not cached:
+                # Load ComfyUI workflow
+                loaded = load_workflow("text_to_image_workflow")
+                if loaded is not None:
+                    workflow, prompt_paths = loaded
+                    image_path = await call_comfyui_api(workflow, request.prompt, prompt_paths)
+                    # Placeholders from a failed call shouldn't hide a later real render
+                    if image_path.startswith(str(COMFYUI_OUTPUT_DIR)):
+                        remember_asset(key, image_path)
+                else:
+                    image_path = create_placeholder_image(request.prompt)
             
             results["image"] = image_path
             
@@ -126,59 +370,62 @@ async def generate_media(request: MediaGenerationRequest):
             # Generate speech or music
             if request.voice:
                 # Text to speech
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{SERVICES['audio']}/api/tts",
-                        json={
-                            "text": request.prompt,
-                            "voice": request.voice
-                        }
-                    ) as response:
-                        if response.status == 200:
-                            audio_data = await response.read()
-                            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-                            temp_file.write(audio_data)
-                            results["audio"] = temp_file.name
+                key = asset_key("tts", request.prompt, request.voice)
+                audio_path = cached_asset(key)
+                cached = audio_path is not None
+                if not cached:
+                    audio_path = await fetch_audio(key, "/api/tts", {
+                        "text": request.prompt,
+                        "voice": request.voice
+                    }, app.state.tts_slots)
+                if audio_path:
+                    results["audio"] = audio_path
             
             elif request.music_style:
                 # Generate music
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{SERVICES['audio']}/api/generate_music",
-                        json={
-                            "prompt": request.prompt,
-                            "style": request.music_style,
-                            "duration": request.duration or 30
-                        }
-                    ) as response:
-                        if response.status == 200:
-                            music_data = await response.read()
-                            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-                            temp_file.write(music_data)
-                            results["music"] = temp_file.name
+                duration = request.duration or 30
+                key = asset_key("music", request.prompt, request.music_style, duration)
+                music_path = cached_asset(key)
+                cached = music_path is not None
+                if not cached:
+                    music_path = await fetch_audio(key, "/api/generate_music", {
+                        "prompt": request.prompt,
+                        "style": request.music_style,
+                        "duration": duration
+                    }, app.state.music_slots)
+                if music_path:
+                    results["music"] = music_path
         
         elif request.media_type == "video":
             # Generate video from prompt
-            # First generate keyframes
-            frames = []
+            # First generate keyframes; they're independent, so render them in parallel off the event loop
+            loop = asyncio.get_running_loop()
             frame_prompts = [f"{request.prompt} - frame {i+1}" for i in range(8)]
-            
-            for frame_prompt in frame_prompts:
-                image_path = create_placeholder_image(frame_prompt)
-                frames.append(image_path)
+            frames = await asyncio.gather(*(
+                loop.run_in_executor(None, render_placeholder_png, frame_prompt)
+                for frame_prompt in frame_prompts
+            ))
             
             # Combine into video
-            video_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-            
-            # Use ffmpeg to create video from frames
-            frame_pattern = tempfile.NamedTemporaryFile(delete=False, suffix='_%d.png').name
-            for i, frame in enumerate(frames):
-                shutil.copy(frame, frame_pattern.replace('%d', str(i)))
+            video_path = await loop.run_in_executor(None, new_temp_path, '.mp4')
             
-            subprocess.run([
-                'ffmpeg', '-framerate', '2', '-i', frame_pattern,
-                '-c:v', 'libx264', '-pix_fmt', 'yuv420p', video_path, '-y'
-            ], capture_output=True)
+            # Pipe the encoded frames into one ffmpeg process instead of round-tripping through disk
+            process = await asyncio.create_subprocess_exec(
+                'ffmpeg', '-framerate', '2', '-f', 'image2pipe', '-i', '-',
+                '-c:v', 'libx264', '-pix_fmt', 'yuv420p', video_path, '-y',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+            # Drain stderr alongside the writes so a chatty ffmpeg can't fill the pipe and stall
+            stderr = asyncio.ensure_future(process.stderr.read())
+            for frame in frames:
+                process.stdin.write(frame)
+                await process.stdin.drain()
+            process.stdin.close()
+            returncode = await process.wait()
+            error_output = await stderr
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg failed: {error_output.decode(errors='replace')[-500:]}")
             
             results["video"] = video_path
         
@@ -201,6 +448,7 @@ async def generate_media(request: MediaGenerationRequest):
             "prompt": request.prompt,
             "media_type": request.media_type,
             "results": results,
+            "cached": cached,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -214,26 +462,28 @@ async def create_storyboard(request: StoryboardRequest):
         # Parse story into scenes
         scenes = []
         story_parts = request.story.split('.')[:request.scenes]
+        numbered = [(i, part.strip()) for i, part in enumerate(story_parts) if part.strip()]
         
-        for i, part in enumerate(story_parts):
-            if part.strip():
-                scene = {
-                    "number": i + 1,
-                    "text": part.strip(),
-                    "image": create_placeholder_image(f"Scene {i+1}: {part.strip()}")
-                }
-                
-                if request.include_audio:
-                    # Generate narration for scene
-                    scene["audio"] = f"narration_scene_{i+1}.mp3"
-                
-                scenes.append(scene)
+        # Scene images are independent, so render them all at once off the event loop
+        images = await create_placeholder_images([f"Scene {i+1}: {text}" for i, text in numbered])
+        
+        for (i, text), image in zip(numbered, images):
+            scene = {
+                "number": i + 1,
+                "text": text,
+                "image": image
+            }
+            
+            if request.include_audio:
+                # Generate narration for scene
+                scene["audio"] = f"narration_scene_{i+1}.mp3"
+            
+            scenes.append(scene)
         
         # Create output video/presentation
-        output_path = tempfile.NamedTemporaryFile(
-            delete=False, 
-            suffix=f'.{request.output_format}'
-        ).name
+        output_path = await asyncio.get_running_loop().run_in_executor(
+            None, new_temp_path, f'.{request.output_format}'
+        )
         
         # Would combine scenes into final output here
         
@@ -272,13 +522,12 @@ async def create_content(request: ContentCreationRequest):
                     "title": section,
                     "text": f"Content for {section} about {request.topic}"
                 }
-                
-                if request.include_images:
-                    section_content["image"] = create_placeholder_image(
-                        f"{request.topic} - {section}"
-                    )
-                
                 content["sections"].append(section_content)
+            
+            if request.include_images:
+                images = await create_placeholder_images([f"{request.topic} - {section}" for section in sections])
+                for section_content, image in zip(content["sections"], images):
+                    section_content["image"] = image
         
         elif request.content_type == "presentation":
             # Generate presentation slides
@@ -291,11 +540,14 @@ async def create_content(request: ContentCreationRequest):
                     "content": f"Content about {request.topic}",
                     "notes": "Speaker notes here"
                 }
-                
-                if request.include_images:
-                    slide["image"] = create_placeholder_image(f"Slide {i+1}: {request.topic}")
-                
                 content["sections"].append(slide)
+            
+            if request.include_images:
+                images = await create_placeholder_images(
+                    [f"Slide {i+1}: {request.topic}" for i in range(num_slides)]
+                )
+                for slide, image in zip(content["sections"], images):
+                    slide["image"] = image
         
         elif request.content_type == "social_media":
             # Generate social media posts
@@ -307,11 +559,15 @@ async def create_content(request: ContentCreationRequest):
                     "text": f"Post about {request.topic} for {platform}",
                     "hashtags": ["#AI", "#Automation", f"#{request.topic.replace(' ', '')}"]
                 }
-                
-                if request.include_images and platform != "twitter":
-                    post["image"] = create_placeholder_image(f"{platform}: {request.topic}")
-                
                 content["sections"].append(post)
+            
+            if request.include_images:
+                posts = [post for post in content["sections"] if post["platform"] != "twitter"]
+                images = await create_placeholder_images(
+                    [f"{post['platform']}: {request.topic}" for post in posts]
+                )
+                for post, image in zip(posts, images):
+                    post["image"] = image
         
         elif request.content_type == "tutorial":
             # Generate tutorial steps
@@ -325,12 +581,13 @@ async def create_content(request: ContentCreationRequest):
                     "instruction": f"Detailed instruction for step {i+1}",
                     "tip": "Pro tip for this step"
                 }
-                
-                if request.include_images:
-                    step["image"] = create_placeholder_image(f"Tutorial Step {i+1}")
-                
                 steps.append(step)
             
+            if request.include_images:
+                images = await create_placeholder_images([f"Tutorial Step {i+1}" for i in range(num_steps)])
+                for step, image in zip(steps, images):
+                    step["image"] = image
+            
             content["sections"] = steps
         
         # Add audio if requested
@@ -339,19 +596,19 @@ async def create_content(request: ContentCreationRequest):
         
         # Save to Obsidian if available
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{SERVICES['obsidian']}/api/notes/create",
-                    json={
-                        "title": f"{request.topic} - {request.content_type}",
-                        "content": json.dumps(content, indent=2),
-                        "folder": "Generated Content",
-                        "tags": ["generated", request.content_type]
-                    }
-                ) as response:
-                    if response.status == 200:
-                        obsidian_result = await response.json()
-                        content["obsidian_note"] = obsidian_result.get("path")
+            session = await get_session()
+            async with session.post(
+                f"{SERVICES['obsidian']}/api/notes/create",
+                json={
+                    "title": f"{request.topic} - {request.content_type}",
+                    "content": orjson.dumps(content, option=orjson.OPT_INDENT_2).decode(),
+                    "folder": "Generated Content",
+                    "tags": ["generated", request.content_type]
+                }
+            ) as response:
+                if response.status == 200:
+                    obsidian_result = await response.json()
+                    content["obsidian_note"] = obsidian_result.get("path")
         except:
             pass  # Obsidian integration is optional
         
@@ -360,6 +617,59 @@ async def create_content(request: ContentCreationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Context key each step type publishes for later steps' templates
+STEP_CONTEXT_KEYS = {
+    "generate_image": "last_image",
+    "generate_audio": "last_audio"
+}
+
+# Step field formatted against the context, per step type
+STEP_TEMPLATE_FIELDS = {
+    "generate_image": "prompt",
+    "generate_audio": "text"
+}
+
+def _step_fields(step: Dict[str, Any]) -> set:
+    """Context keys referenced by a step's template"""
+    template = step.get(STEP_TEMPLATE_FIELDS.get(step.get("type"), ""), "")
+    fields = set()
+    try:
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field:
+                fields.add(field.split(".")[0].split("[")[0])
+    except ValueError:
+        pass  # Malformed template; the step itself reports the error when it formats
+    return fields
+
+async def _run_step(step: Dict[str, Any], step_name: str, context: Dict[str, Any]) -> tuple:
+    """Execute one workflow step; returns (outputs, context updates)"""
+    step_type = step.get("type")
+    
+    if step_type == "generate_image":
+        prompt = step.get("prompt", "").format(**context)
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(None, create_placeholder_image, prompt)
+        return {step_name: image}, {"last_image": image}
+    
+    elif step_type == "generate_audio":
+        text = step.get("text", "").format(**context)
+        audio = f"audio_{step_name}.mp3"
+        return {step_name: audio}, {"last_audio": audio}
+    
+    elif step_type == "process_file":
+        # File processing step
+        return {step_name: "processed_file"}, {}
+    
+    elif step_type == "combine_media":
+        # Combine multiple media files
+        return {step_name: "combined_output.mp4"}, {}
+    
+    elif step_type == "save_to_obsidian":
+        # Save results to Obsidian
+        return {step_name: "obsidian_note_path"}, {}
+    
+    return {}, {}
+
 @app.post("/api/workflow/custom")
 async def execute_custom_workflow(request: WorkflowRequest):
     """Execute custom multi-step workflows"""
@@ -370,40 +680,47 @@ async def execute_custom_workflow(request: WorkflowRequest):
             "outputs": {}
         }
         
-        context = request.input_data.copy()
+        steps = request.steps
+        names = [step.get("name", f"Step {i + 1}") for i, step in enumerate(steps)]
         
-        for step in request.steps:
-            step_type = step.get("type")
-            step_name = step.get("name", f"Step {len(results['steps_completed']) + 1}")
-            
+        # A step depends on every earlier step that writes a context key its template reads
+        writers: Dict[str, List[int]] = {}
+        depends_on: List[Dict[str, List[int]]] = []
+        levels: List[int] = []
+        for i, step in enumerate(steps):
+            reads = {key: list(writers[key]) for key in _step_fields(step) if key in writers}
+            depends_on.append(reads)
+            levels.append(1 + max((levels[j] for js in reads.values() for j in js), default=-1))
+            written = STEP_CONTEXT_KEYS.get(step.get("type"))
+            if written:
+                writers.setdefault(written, []).append(i)
+        
+        outcomes: List[Optional[tuple]] = [None] * len(steps)  # (outputs, context updates, succeeded)
+        
+        async def run(i: int):
+            # Same view of the context a serial run would have had at this step
+            context = request.input_data.copy()
+            for key, js in depends_on[i].items():
+                for j in reversed(js):
+                    updates = outcomes[j][1]
+                    if key in updates:
+                        context[key] = updates[key]
+                        break
             try:
-                if step_type == "generate_image":
-                    prompt = step.get("prompt", "").format(**context)
-                    image = create_placeholder_image(prompt)
-                    results["outputs"][step_name] = image
-                    context["last_image"] = image
-                
-                elif step_type == "generate_audio":
-                    text = step.get("text", "").format(**context)
-                    results["outputs"][step_name] = f"audio_{step_name}.mp3"
-                    context["last_audio"] = results["outputs"][step_name]
-                
-                elif step_type == "process_file":
-                    # File processing step
-                    results["outputs"][step_name] = "processed_file"
-                
-                elif step_type == "combine_media":
-                    # Combine multiple media files
-                    results["outputs"][step_name] = "combined_output.mp4"
-                
-                elif step_type == "save_to_obsidian":
-                    # Save results to Obsidian
-                    results["outputs"][step_name] = "obsidian_note_path"
-                
-                results["steps_completed"].append(step_name)
-                
+                outputs, updates = await _run_step(steps[i], names[i], context)
+                outcomes[i] = (outputs, updates, True)
             except Exception as e:
-                results["outputs"][step_name] = f"Error: {str(e)}"
+                outcomes[i] = ({names[i]: f"Error: {str(e)}"}, {}, False)
+        
+        # Steps on the same dependency level don't read each other's output, so run them together
+        for level in range(max(levels, default=-1) + 1):
+            await asyncio.gather(*(run(i) for i in range(len(steps)) if levels[i] == level))
+        
+        # Record results in step order, as a serial run would
+        for name, (outputs, _, succeeded) in zip(names, outcomes):
+            results["outputs"].update(outputs)
+            if succeeded:
+                results["steps_completed"].append(name)
         
         return results
         
@@ -413,25 +730,31 @@ async def execute_custom_workflow(request: WorkflowRequest):
 @app.get("/api/services/status")
 async def check_services_status():
     """Check status of all integrated services"""
-    status = {}
+    if status_cache["status"] is not None and time.monotonic() - status_cache["timestamp"] < STATUS_TTL:
+        return status_cache["status"]
+    
+    session = await get_session()
     
-    for service_name, url in SERVICES.items():
+    async def probe(service_name: str, url: str):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=2) as response:
-                    status[service_name] = {
-                        "url": url,
-                        "status": "online" if response.status == 200 else "error",
-                        "code": response.status
-                    }
-        except:
-            status[service_name] = {
+            async with session.get(url, timeout=STATUS_TIMEOUT) as response:
+                return service_name, {
+                    "url": url,
+                    "status": "online" if response.status == 200 else "error",
+                    "code": response.status
+                }
+        except Exception:
+            return service_name, {
                 "url": url,
                 "status": "offline",
                 "code": None
             }
     
-    return status
+    # Probe every service at once so an offline one costs 2s total, not 2s each
+    results = await asyncio.gather(*(probe(name, url) for name, url in SERVICES.items()))
+    status_cache["status"] = dict(results)
+    status_cache["timestamp"] = time.monotonic()
+    return status_cache["status"]
 
 @app.get("/")
 async def root():
@@ -5,20 +5,30 @@ Supports HunyuanVideo, VideoCrafter, Allegro, AnimateDiff, and Stable Video Diff
 """
 
 import os
+import re
+import time
 import json
 import asyncio
 import subprocess
 import tempfile
 import shutil
+import itertools
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache, partial
 import aiohttp
 import base64
 from PIL import Image
 import numpy as np
 import cv2
 
+try:
+    from huggingface_hub import snapshot_download
+except ImportError:
+    snapshot_download = None
+
 from fastapi import FastAPI, HTTPException, File, UploadFile, BackgroundTasks
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
@@ -34,7 +44,10 @@ VIDEO_MODELS = {
         "repo": "Tencent/HunyuanVideo",
         "type": "huggingface",
         "resolution": "1280x720",
-        "max_duration": 16
+        "max_duration": 16,
+        "dtype": "bf16",
+        "compile_mode": "reduce-overhead",
+        "cuda_graphs": True
     },
     "videocrafter1": {
         "name": "VideoCrafter1",
@@ -42,7 +55,10 @@ VIDEO_MODELS = {
         "repo": "cerspense/zeroscope_v2_576w",
         "type": "huggingface",
         "resolution": "1024x576",
-        "max_duration": 10
+        "max_duration": 10,
+        "dtype": "fp16",
+        "compile_mode": "reduce-overhead",
+        "cuda_graphs": True
     },
     "allegro": {
         "name": "Allegro",
@@ -50,7 +66,10 @@ VIDEO_MODELS = {
         "repo": "rhymes-ai/Allegro",
         "type": "huggingface",
         "resolution": "1280x720",
-        "max_duration": 12
+        "max_duration": 12,
+        "dtype": "bf16",
+        "compile_mode": "reduce-overhead",
+        "cuda_graphs": True
     },
     "animatediff": {
         "name": "AnimateDiff",
@@ -66,10 +85,19 @@ VIDEO_MODELS = {
         "repo": "stabilityai/stable-video-diffusion-img2vid-xt",
         "type": "huggingface",
         "resolution": "1024x576",
-        "max_duration": 4
+        "max_duration": 4,
+        "dtype": "fp16",
+        "compile_mode": "reduce-overhead",
+        "cuda_graphs": True
     }
 }
 
+# (width, height) of each video model's default resolution, parsed once
+MODEL_DIMENSIONS = {
+    name: tuple(map(int, config["resolution"].split('x')))
+    for name, config in VIDEO_MODELS.items()
+}
+
 IMAGE_MODELS = {
     "flux": {
         "name": "FLUX.1",
@@ -91,6 +119,190 @@ IMAGE_MODELS = {
     }
 }
 
+# Hardware H.264 encoders in order of preference; libx264 is the software fallback
+H264_ENCODER_ARGS = {
+    "h264_nvenc": ['-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'll', '-rc', 'vbr', '-b:v', '8M'],
+    "h264_videotoolbox": ['-c:v', 'h264_videotoolbox', '-b:v', '8M'],
+    "libx264": ['-c:v', 'libx264'],
+}
+HWACCEL_DECODE_ARGS = {
+    "h264_nvenc": ['-hwaccel', 'cuda'],
+    "h264_videotoolbox": ['-hwaccel', 'videotoolbox'],
+    "libx264": [],
+}
+
+# Fixed pixel format, GOP, B-frames and timescale so generated clips can be concatenated with -c copy
+STREAM_FORMAT_ARGS = ['-pix_fmt', 'yuv420p', '-g', '30', '-bf', '0', '-video_track_timescale', '90000']
+# yuv420p subsamples chroma 2x2, so odd-sized frames get a one-pixel pad to even dimensions
+EVEN_DIMENSIONS_ARGS = ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+
+FFMPEG = shutil.which('ffmpeg')
+FFPROBE = shutil.which('ffprobe')
+MP4V_FOURCC = cv2.VideoWriter_fourcc(*'mp4v')
+
+# Source frame rates by (path, mtime, size), least recently used evicted first
+MAX_PROBED_FPS = 256
+_PROBED_FPS = OrderedDict()
+
+async def probe_fps(path: str) -> Optional[float]:
+    """Frame rate of a video's first stream via ffprobe; None if it can't be determined"""
+    if not FFPROBE:
+        return None
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key in _PROBED_FPS:
+        _PROBED_FPS.move_to_end(key)
+        return _PROBED_FPS[key]
+    
+    process = await asyncio.create_subprocess_exec(
+        FFPROBE, '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=r_frame_rate', '-of', 'default=noprint_wrappers=1:nokey=1', path,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await process.communicate()
+    try:
+        num, den = map(int, stdout.strip().split(b'/'))
+        fps = num / den
+    except (ValueError, ZeroDivisionError):
+        fps = None
+    
+    _PROBED_FPS[key] = fps
+    if len(_PROBED_FPS) > MAX_PROBED_FPS:
+        _PROBED_FPS.popitem(last=False)
+    return fps
+
+def _encoder_works(name: str) -> bool:
+    """Encode one odd-sized test frame with an encoder and report whether ffmpeg succeeded"""
+    try:
+        result = subprocess.run(
+            [FFMPEG, '-hide_banner', '-v', 'error', '-f', 'lavfi', '-i', 'color=c=black:s=321x181', '-frames:v', '1',
+             *EVEN_DIMENSIONS_ARGS, *H264_ENCODER_ARGS[name], *STREAM_FORMAT_ARGS, '-f', 'null', '-'],
+            capture_output=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
+
+def detect_h264_encoder() -> str:
+    """Best H.264 encoder this ffmpeg build offers and this machine can actually drive"""
+    if not FFMPEG:
+        return "libx264"
+    try:
+        result = subprocess.run(
+            [FFMPEG, '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return "libx264"
+    available = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    # Builds list nvenc/videotoolbox even without the hardware, so confirm with a real encode
+    return next(
+        (name for name in H264_ENCODER_ARGS if name != "libx264" and name in available and _encoder_works(name)),
+        "libx264"
+    )
+
+H264_ENCODER = detect_h264_encoder()
+
+# Videos generated at once by /api/video/batch
+BATCH_CONCURRENCY = int(os.environ.get("VIDEO_BATCH_CONCURRENCY", os.cpu_count() or 4))
+
+def _cuda_devices() -> int:
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount()
+    except (AttributeError, cv2.error):
+        return 0
+
+# Warp motion frames on the GPU when OpenCV was built with CUDA, else via OpenCL UMats if present
+CUDA_WARP = _cuda_devices() > 0
+OPENCL_WARP = not CUDA_WARP and cv2.ocl.haveOpenCL()
+
+def motion_matrices(motion_type: str, num_frames: int, width: int, height: int) -> Optional[np.ndarray]:
+    """Contiguous (num_frames, 2, 3) float32 affine matrices for a motion effect; None for a still image"""
+    progress = np.arange(num_frames, dtype=np.float32) / num_frames
+    matrices = np.zeros((num_frames, 2, 3), dtype=np.float32)
+    if motion_type == "zoom_in":
+        # Same as getRotationMatrix2D(center, 0, scale) for every frame at once
+        scale = 1 + progress * 0.2
+        matrices[:, 0, 0] = matrices[:, 1, 1] = scale
+        matrices[:, 0, 2] = (1 - scale) * (width // 2)
+        matrices[:, 1, 2] = (1 - scale) * (height // 2)
+    elif motion_type == "pan_left":
+        matrices[:, 0, 0] = matrices[:, 1, 1] = 1
+        matrices[:, 0, 2] = -(progress * width * 0.2).astype(np.int64)
+    else:
+        return None
+    return matrices
+
+async def write_video(frames, width: int, height: int, fps: int, output_path: str):
+    """Encode BGR frames to H.264 through ffmpeg, or with OpenCV's mp4v when ffmpeg is missing"""
+    if not FFMPEG:
+        out = cv2.VideoWriter(output_path, MP4V_FOURCC, fps, (width, height))
+        for frame in frames:
+            out.write(frame)
+        out.release()
+        return
+    
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG, '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+        *EVEN_DIMENSIONS_ARGS, *H264_ENCODER_ARGS[H264_ENCODER], *STREAM_FORMAT_ARGS, output_path, '-y',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    # Drain stderr alongside the writes so ffmpeg can't stall on a full pipe
+    stderr = asyncio.ensure_future(process.stderr.read())
+    for frame in frames:
+        process.stdin.write(frame.tobytes())
+        await process.stdin.drain()
+    process.stdin.close()
+    returncode = await process.wait()
+    error_output = await stderr
+    if returncode != 0:
+        raise RuntimeError(f"Encoding failed: {error_output.decode(errors='replace')[-500:]}")
+
+# Read size for streamed ffmpeg output
+STREAM_CHUNK = 1 << 16
+
+async def stream_video(frames, width: int, height: int, fps: int):
+    """Encode BGR frames through ffmpeg and yield fragmented MP4 chunks as they are produced"""
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG, '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+        *EVEN_DIMENSIONS_ARGS, *H264_ENCODER_ARGS[H264_ENCODER], *STREAM_FORMAT_ARGS,
+        '-movflags', '+frag_keyframe+empty_moov', '-f', 'mp4', 'pipe:1',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    # Drained alongside stdout so ffmpeg can't stall on a full stderr pipe
+    stderr = asyncio.ensure_future(process.stderr.read())
+    
+    async def feed():
+        try:
+            for frame in frames:
+                process.stdin.write(frame.tobytes())
+                await process.stdin.drain()
+        finally:
+            process.stdin.close()
+    
+    # Frames are fed concurrently so encoding overlaps with sending output to the client
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while True:
+            chunk = await process.stdout.read(STREAM_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+        await feeder
+        returncode = await process.wait()
+        error_output = await stderr
+        # Headers are already sent, so this aborts the response rather than returning a truncated MP4 as complete
+        if returncode != 0:
+            raise RuntimeError(f"Encoding failed: {error_output.decode(errors='replace')[-500:]}")
+    finally:
+        feeder.cancel()
+        stderr.cancel()
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
 class VideoGenerationRequest(BaseModel):
     prompt: str
     model: str = "videocrafter1"
@@ -125,31 +337,100 @@ class BatchGenerationRequest(BaseModel):
     duration: int = 4
     combine: bool = False  # Combine into single video
 
+# First column of `ollama list` output, and the model families that accept images
+OLLAMA_NAME_RE = re.compile(r'^(\S+)', re.M)
+VISION_MODEL_FAMILIES = ("llava", "bakllava", "moondream")
+
+# `ollama list` is shared by every caller within OLLAMA_LIST_TTL seconds
+OLLAMA_LIST_TTL = 2.0
+OLLAMA_LIST_TIMEOUT = 5.0
+_OLLAMA_LIST = {"at": 0.0, "task": None}
+
+async def _list_ollama_vision_models() -> Optional[List[str]]:
+    """Vision models reported by `ollama list`; None if it fails or times out"""
+    process = await asyncio.create_subprocess_exec(
+        "ollama", "list",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), OLLAMA_LIST_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    
+    if process.returncode != 0:
+        return None
+    names = OLLAMA_NAME_RE.findall(stdout.decode())[1:]  # Skip header
+    return [
+        name for name in names
+        if any(family in name.lower() for family in VISION_MODEL_FAMILIES)
+    ]
+
+async def ollama_vision_models() -> Optional[List[str]]:
+    """Cached _list_ollama_vision_models; concurrent callers share one subprocess"""
+    now = time.monotonic()
+    if _OLLAMA_LIST["task"] is None or now - _OLLAMA_LIST["at"] >= OLLAMA_LIST_TTL:
+        _OLLAMA_LIST["at"] = now
+        _OLLAMA_LIST["task"] = asyncio.ensure_future(_list_ollama_vision_models())
+    # Shielded so one cancelled caller doesn't cancel the listing for the others
+    return await asyncio.shield(_OLLAMA_LIST["task"])
+
+OLLAMA_URL = "http://localhost:11434"
+
+# Parallel file downloads within one HuggingFace snapshot
+HF_DOWNLOAD_WORKERS = 8
+
+@app.on_event("startup")
+async def open_http_session():
+    app.state.http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+    )
+
+@app.on_event("shutdown")
+async def close_http_session():
+    await app.state.http_session.close()
+
+HF_CACHE = Path("~/.cache/huggingface/hub").expanduser()
+
+@lru_cache(maxsize=1)
+def _snapshot_installed(mtime: float) -> frozenset:
+    """Lowercased HuggingFace cache entries, listed once per change to the cache directory"""
+    return frozenset(item.name.lower() for item in HF_CACHE.iterdir())
+
 def check_model_installed(model_name: str) -> bool:
     """Check if a model is installed locally"""
     model_path = Path(f"~/ComfyUI/models/checkpoints/{model_name}").expanduser()
-    hf_cache = Path("~/.cache/huggingface/hub").expanduser()
     
     # Check multiple possible locations
     if model_path.exists():
         return True
     
     # Check HuggingFace cache
-    if hf_cache.exists():
-        for item in hf_cache.iterdir():
-            if model_name.lower() in item.name.lower():
-                return True
-    
-    return False
+    try:
+        installed = _snapshot_installed(HF_CACHE.stat().st_mtime)
+    except FileNotFoundError:
+        return False
+    needle = model_name.lower()
+    return any(needle in name for name in installed)
 
 async def download_huggingface_model(repo_id: str, model_type: str = "video"):
     """Download model from HuggingFace"""
+    local_dir = f"./models/{model_type}/{repo_id.split('/')[-1]}"
     try:
-        # Use huggingface-cli to download
+        # In-process download with parallel file fetches; no interpreter startup per call
+        if snapshot_download:
+            await asyncio.get_running_loop().run_in_executor(
+                None, partial(snapshot_download, repo_id, local_dir=local_dir, max_workers=HF_DOWNLOAD_WORKERS)
+            )
+            return True, f"Downloaded {repo_id}"
+        
+        # Fall back to huggingface-cli when huggingface_hub isn't importable here
         cmd = [
             "huggingface-cli", "download",
             repo_id,
-            "--local-dir", f"./models/{model_type}/{repo_id.split('/')[-1]}"
+            "--local-dir", local_dir
         ]
         
         process = await asyncio.create_subprocess_exec(
@@ -184,25 +465,125 @@ async def setup_ollama_model(model_name: str):
             # Default to LLaVA for vision tasks
             model_to_pull = "llava:13b"
         
-        # Pull the model
-        cmd = ["ollama", "pull", model_to_pull]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            return True, f"Pulled {model_to_pull} for vision tasks"
-        else:
-            return False, f"Error: {stderr.decode()}"
+        # Pull the model through the Ollama API on the shared session
+        async with app.state.http_session.post(
+            f"{OLLAMA_URL}/api/pull",
+            json={"name": model_to_pull, "stream": False},
+            timeout=aiohttp.ClientTimeout(total=None)
+        ) as response:
+            if response.status == 200:
+                return True, f"Pulled {model_to_pull} for vision tasks"
+            else:
+                return False, f"Error: {await response.text()}"
     
     except Exception as e:
         return False, str(e)
 
+def placeholder_frames(request: VideoGenerationRequest):
+    """(width, height, frames) for a request; frames is an iterator of BGR arrays"""
+    if request.resolution:
+        width, height = map(int, request.resolution.split('x'))
+    else:
+        width, height = MODEL_DIMENSIONS[request.model]
+    num_frames = request.duration * request.fps
+    
+    # Gradient placeholder: every frame's BGR colour precomputed, then filled into one reused frame buffer
+    color = (255 * np.arange(num_frames)) // num_frames
+    palette = np.stack([color, np.full(num_frames, 128), 255 - color], axis=1).astype(np.uint8)
+    
+    def frames():
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        for bgr in palette:
+            frame[:] = bgr
+            yield frame
+    
+    return width, height, frames()
+
+async def _render_video(request: VideoGenerationRequest) -> Dict[str, Any]:
+    """Render one video for an already validated request"""
+    # For now, create a placeholder video
+    # In production, this would call the actual model
+    output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+    
+    # Generate frames (placeholder - would be actual model output)
+    width, height, frames = placeholder_frames(request)
+    await write_video(frames, width, height, request.fps, output_path)
+    
+    return {
+        "status": "success",
+        "video_path": output_path,
+        "model": request.model,
+        "duration": request.duration,
+        "resolution": f"{width}x{height}",
+        "fps": request.fps,
+        "prompt": request.prompt
+    }
+
+# Torch dtypes for the "dtype" setting in VIDEO_MODELS
+TORCH_DTYPES = {"fp16": "float16", "bf16": "bfloat16", "fp32": "float32"}
+
+def optimize_pipeline(pipe, model_config: Dict[str, Any]):
+    """Apply a model's dtype, torch.compile and CUDA graph settings to a freshly loaded diffusers pipeline"""
+    import torch
+    
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision('high')
+    pipe = pipe.to(getattr(torch, TORCH_DTYPES[model_config.get("dtype", "fp32")]))
+    
+    mode = model_config.get("compile_mode")
+    if mode:
+        # reduce-overhead and max-autotune capture CUDA graphs; opt out per model with cuda_graphs=False
+        if not model_config.get("cuda_graphs", True):
+            mode = {"reduce-overhead": "default", "max-autotune": "max-autotune-no-cudagraphs"}.get(mode, mode)
+        denoiser = "transformer" if getattr(pipe, "transformer", None) is not None else "unet"
+        setattr(pipe, denoiser, torch.compile(getattr(pipe, denoiser), mode=mode))
+    return pipe
+
+async def _generate_batch(requests: List[VideoGenerationRequest]) -> List[Any]:
+    """Render a batch of requests; results (or exceptions) in request order.
+
+    The placeholder renders each request separately. A real model would be loaded
+    once through optimize_pipeline and run the batch as one forward pass here.
+    """
+    return await asyncio.gather(*(_render_video(request) for request in requests), return_exceptions=True)
+
+# Requests arriving within MAX_BATCH_LATENCY seconds are generated together, up to MAX_BATCH_SIZE
+MAX_BATCH_LATENCY = 0.1
+MAX_BATCH_SIZE = 4
+
+async def generation_worker(queue: asyncio.Queue):
+    """Collect queued generation requests into batches and resolve each caller's future"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + MAX_BATCH_LATENCY
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        results = await _generate_batch([request for request, _ in batch])
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+@app.on_event("startup")
+async def start_generation_worker():
+    app.state.generation_queue = asyncio.Queue()
+    app.state.generation_worker = asyncio.create_task(generation_worker(app.state.generation_queue))
+
+@app.on_event("shutdown")
+async def stop_generation_worker():
+    app.state.generation_worker.cancel()
+
 @app.post("/api/video/generate")
 async def generate_video(request: VideoGenerationRequest):
     """Generate video from text prompt"""
@@ -219,44 +600,34 @@ async def generate_video(request: VideoGenerationRequest):
                 "model_info": model_config
             }
         
-        # For now, create a placeholder video
-        # In production, this would call the actual model
-        output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-        
-        # Generate frames (placeholder - would be actual model output)
-        frames = []
-        width, height = map(int, (request.resolution or model_config["resolution"]).split('x'))
-        num_frames = request.duration * request.fps
-        
-        for i in range(num_frames):
-            # Create gradient frame as placeholder
-            frame = np.zeros((height, width, 3), dtype=np.uint8)
-            color = int(255 * (i / num_frames))
-            frame[:, :] = [color, 128, 255 - color]
-            frames.append(frame)
-        
-        # Write video using OpenCV
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, request.fps, (width, height))
-        
-        for frame in frames:
-            out.write(frame)
-        
-        out.release()
-        
-        return {
-            "status": "success",
-            "video_path": output_path,
-            "model": request.model,
-            "duration": request.duration,
-            "resolution": f"{width}x{height}",
-            "fps": request.fps,
-            "prompt": request.prompt
-        }
+        # Concurrent requests are coalesced into batches by the generation worker
+        future = asyncio.get_running_loop().create_future()
+        app.state.generation_queue.put_nowait((request, future))
+        return await future
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/video/generate/stream")
+async def generate_video_stream(request: VideoGenerationRequest):
+    """Generate video from text prompt, streaming the MP4 as it is encoded instead of writing a file"""
+    model_config = VIDEO_MODELS.get(request.model)
+    if not model_config:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {request.model}")
+    
+    if not check_model_installed(request.model):
+        return {
+            "status": "model_not_installed",
+            "message": f"Model {request.model} not installed. Use /api/models/download to install it.",
+            "model_info": model_config
+        }
+    
+    if not FFMPEG:
+        raise HTTPException(status_code=503, detail="Streaming requires ffmpeg")
+    
+    width, height, frames = placeholder_frames(request)
+    return StreamingResponse(stream_video(frames, width, height, request.fps), media_type="video/mp4")
+
 @app.post("/api/video/image_to_video")
 async def image_to_video(request: ImageToVideoRequest):
     """Convert image to video with motion"""
@@ -274,29 +645,46 @@ async def image_to_video(request: ImageToVideoRequest):
         
         # Create output video
         output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, request.fps, (width, height))
         
         num_frames = request.duration * request.fps
         
-        for i in range(num_frames):
-            frame = img.copy()
-            
-            # Apply motion effect
-            if request.motion_type == "zoom_in":
-                scale = 1 + (i / num_frames) * 0.2
-                center = (width // 2, height // 2)
-                M = cv2.getRotationMatrix2D(center, 0, scale)
-                frame = cv2.warpAffine(frame, M, (width, height))
-            
-            elif request.motion_type == "pan_left":
-                shift = int((i / num_frames) * width * 0.2)
-                M = np.float32([[1, 0, -shift], [0, 1, 0]])
-                frame = cv2.warpAffine(frame, M, (width, height))
-            
-            out.write(frame)
-        
-        out.release()
+        # Apply motion effect; the source is uploaded once and every frame's matrix is precomputed
+        matrices = motion_matrices(request.motion_type, num_frames, width, height)
+        
+        def motion_frames():
+            if matrices is None:
+                for _ in range(num_frames):
+                    yield img
+            elif CUDA_WARP:
+                # Double-buffered: frame i is warped and downloaded on the stream while frame i-1 is encoded
+                stream = cv2.cuda_Stream()
+                src = cv2.cuda_GpuMat()
+                src.upload(img, stream)
+                warped = [cv2.cuda_GpuMat(height, width, cv2.CV_8UC3) for _ in range(2)]
+                pinned = [
+                    cv2.cuda_HostMem(height, width, cv2.CV_8UC3, cv2.cuda.HostMem_PAGE_LOCKED).createMatHeader()
+                    for _ in range(2)
+                ]
+                for i, M in enumerate(matrices):
+                    cv2.cuda.warpAffine(src, M, (width, height), dst=warped[i % 2], stream=stream)
+                    warped[i % 2].download(stream, pinned[i % 2])
+                    if i:
+                        yield pinned[(i - 1) % 2]
+                    stream.waitForCompletion()
+                if len(matrices):
+                    yield pinned[(len(matrices) - 1) % 2]
+            elif OPENCL_WARP:
+                src = cv2.UMat(img)
+                dst = cv2.UMat(height, width, cv2.CV_8UC3)
+                for M in matrices:
+                    yield cv2.warpAffine(src, M, (width, height), dst=dst).get()
+            else:
+                # Warp into one preallocated frame; write_video consumes it before the next warp
+                dst = np.empty_like(img)
+                for M in matrices:
+                    yield cv2.warpAffine(img, M, (width, height), dst=dst)
+        
+        await write_video(motion_frames(), width, height, request.fps, output_path)
         
         return {
             "status": "success",
@@ -317,22 +705,40 @@ async def interpolate_video(request: VideoInterpolationRequest):
         if not Path(request.video_path).exists():
             raise HTTPException(status_code=404, detail="Video file not found")
         
+        # Nothing to interpolate when the source already has the target frame rate
+        source_fps = await probe_fps(request.video_path)
+        if source_fps and source_fps >= request.target_fps * 0.99:
+            return {
+                "status": "noop",
+                "video_path": request.video_path,
+                "original_path": request.video_path,
+                "source_fps": source_fps,
+                "target_fps": request.target_fps,
+                "method": request.interpolation_method
+            }
+        
         # Use ffmpeg for interpolation
         output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
         
-        cmd = [
-            'ffmpeg', '-i', request.video_path,
-            '-filter:v', f'minterpolate=fps={request.target_fps}:mi_mode=mci:mc_mode=aobmc:me_mode=bidir:vsbmc=1',
-            '-c:v', 'libx264', output_path, '-y'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
+        # Decode and encode on the GPU when available; minterpolate itself only runs on the CPU.
+        # If the hardware command fails, retry in software without -hwaccel.
+        encoders = [H264_ENCODER] if H264_ENCODER == "libx264" else [H264_ENCODER, "libx264"]
+        for encoder in encoders:
+            cmd = [
+                'ffmpeg', *HWACCEL_DECODE_ARGS[encoder], '-i', request.video_path,
+                '-filter:v', f'minterpolate=fps={request.target_fps}:mi_mode=mci:mc_mode=aobmc:me_mode=bidir:vsbmc=1',
+                *H264_ENCODER_ARGS[encoder], output_path, '-y'
+            ]
+            
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            stdout, stderr = await process.communicate()
+            if process.returncode == 0:
+                break
         
         if process.returncode == 0:
             return {
@@ -379,6 +785,9 @@ async def download_model(request: ModelDownloadRequest):
             success = False
             message = "ComfyUI model installation requires manual setup"
         
+        if success:
+            _snapshot_installed.cache_clear()
+        
         return {
             "status": "success" if success else "failed",
             "model": request.model_name,
@@ -393,51 +802,56 @@ async def download_model(request: ModelDownloadRequest):
 async def batch_generate(request: BatchGenerationRequest):
     """Generate multiple videos from prompts"""
     try:
-        results = []
-        
-        for prompt in request.prompts:
-            gen_request = VideoGenerationRequest(
-                prompt=prompt,
-                model=request.model,
-                duration=request.duration
-            )
-            
-            result = await generate_video(gen_request)
-            results.append(result)
+        gen_requests = [
+            VideoGenerationRequest(prompt=prompt, model=request.model, duration=request.duration)
+            for prompt in request.prompts
+        ]
         
-        if request.combine and len(results) > 1:
-            # Combine videos into one
-            output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-            
-            # Create file list for concatenation
-            list_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt')
-            for result in results:
-                list_file.write(f"file '{result['video_path']}'\n")
-            list_file.close()
+        if request.combine and len(gen_requests) > 1:
+            model_config = VIDEO_MODELS.get(request.model)
+            if not model_config:
+                raise HTTPException(status_code=400, detail=f"Unknown model: {request.model}")
             
-            # Concatenate using ffmpeg
-            cmd = [
-                'ffmpeg', '-f', 'concat', '-safe', '0',
-                '-i', list_file.name, '-c', 'copy', output_path, '-y'
-            ]
+            if not check_model_installed(request.model):
+                return {
+                    "status": "model_not_installed",
+                    "message": f"Model {request.model} not installed. Use /api/models/download to install it.",
+                    "model_info": model_config
+                }
             
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # Every prompt's frames go through one encoder into the combined file; no per-prompt files or concat pass
+            output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+            clips = [placeholder_frames(gen_request) for gen_request in gen_requests]
+            width, height, _ = clips[0]
+            fps = gen_requests[0].fps
+            await write_video(
+                itertools.chain.from_iterable(frames for _, _, frames in clips),
+                width, height, fps, output_path
             )
             
-            await process.communicate()
-            
-            os.unlink(list_file.name)
+            segments = [
+                {"prompt": gen_request.prompt, "start": i * gen_request.duration, "duration": gen_request.duration}
+                for i, gen_request in enumerate(gen_requests)
+            ]
             
             return {
                 "status": "success",
                 "combined_video": output_path,
-                "individual_videos": results,
+                "segments": segments,
+                "resolution": f"{width}x{height}",
+                "fps": fps,
                 "total_prompts": len(request.prompts)
             }
         
+        slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def generate(gen_request: VideoGenerationRequest):
+            async with slots:
+                return await generate_video(gen_request)
+        
+        # Prompts are independent; generate them concurrently, in order, up to BATCH_CONCURRENCY at a time
+        results = await asyncio.gather(*(generate(gen_request) for gen_request in gen_requests))
+        
         return {
             "status": "success",
             "videos": results,
@@ -470,30 +884,16 @@ async def list_models():
     
     # Check Ollama vision models
     try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True
-        )
+        ollama_models = await ollama_vision_models()
         
-        if result.returncode == 0:
-            ollama_models = []
-            for line in result.stdout.split('\n')[1:]:  # Skip header
-                if line.strip():
-                    parts = line.split()
-                    if parts:
-                        model_name = parts[0]
-                        # Check if it's a vision model
-                        if any(vm in model_name.lower() for vm in ["llava", "bakllava", "moondream"]):
-                            ollama_models.append(model_name)
-            
+        if ollama_models is not None:
             models_status["ollama_vision"] = {
                 "type": "vision",
                 "installed": True,
                 "models": ollama_models
             }
-    except:
-        pass
+    except OSError:
+        pass  # Ollama not installed
     
     return {
         "models": models_status,
@@ -513,6 +913,7 @@ async def root():
         "version": "2.0.0",
         "endpoints": {
             "/api/video/generate": "Generate video from text",
+            "/api/video/generate/stream": "Generate video from text as a streamed MP4",
             "/api/video/image_to_video": "Convert image to video",
             "/api/video/interpolate": "Increase video FPS",
             "/api/video/batch": "Batch video generation",
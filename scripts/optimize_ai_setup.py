@@ -4,16 +4,355 @@ AI Setup Optimizer - Configures and optimizes ComfyUI and Stable Diffusion WebUI
 """
 
 import os
-import json
-import shutil
+import sys
+import argparse
 from pathlib import Path
-from typing import Dict, List, Any
+from types import MappingProxyType
+from collections import defaultdict
+from typing import Dict, List, Any, Tuple, Optional, Final
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# SIMD tree hashing when blake3 is installed (pip install blake3); stdlib BLAKE2 otherwise
+try:
+    from blake3 import blake3 as content_hasher
+except ImportError:
+    from hashlib import blake2b as content_hasher
+
+# Directories listed concurrently while scanning model folders; listing and stat release the GIL
+SCAN_WORKERS = 8
+
+def _scan_dir(path: str, suffix: str) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    """Matching files (with size and mtime) and subdirectories directly inside path"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(suffix) and entry.is_file():
+                    # Plain path strings; no Path object is built per match
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    except OSError:
+        pass
+    return files, subdirs
+
+def dump_settings(settings: Dict[str, Any]) -> bytes:
+    """Settings serialized as 2-space indented JSON in one buffer"""
+    if orjson:
+        return orjson.dumps(settings, option=orjson.OPT_INDENT_2)
+    import json
+    # Raw UTF-8 like orjson, so switching backends never changes the bytes written
+    return json.dumps(settings, indent=2, ensure_ascii=False, separators=(',', ': ')).encode()
+
+def load_settings(data: bytes) -> Dict[str, Any]:
+    if orjson:
+        return orjson.loads(data)
+    import json
+    return json.loads(data)
+
+def write_if_changed(path: Path, data: bytes, current: Optional[bytes] = None) -> bool:
+    """Atomically replace path with data unless it already holds exactly those bytes"""
+    if current is None and path.exists():
+        current = path.read_bytes()
+    if current == data:
+        return False
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+# Bytes hashed from each end of a model file; the safetensors header sits at the start
+HASH_EDGE_BYTES = 4 * 1024 * 1024
+
+def edge_digest(path: str, size: int) -> bytes:
+    """Hash of the first and last HASH_EDGE_BYTES of a file (the whole file if it is small)"""
+    hasher = content_hasher()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if size <= 2 * HASH_EDGE_BYTES:
+            hasher.update(os.pread(fd, size, 0))
+        else:
+            hasher.update(os.pread(fd, HASH_EDGE_BYTES, 0))
+            hasher.update(os.pread(fd, HASH_EDGE_BYTES, size - HASH_EDGE_BYTES))
+    finally:
+        os.close(fd)
+    return hasher.digest()
+
+def scan_files(root: str, suffix: str) -> List[Tuple[str, int, int]]:
+    """(path, size, mtime_ns) of every file under root ending in suffix, sorted by path"""
+    found = []
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        pending = {pool.submit(_scan_dir, root, suffix)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                pending.update(pool.submit(_scan_dir, subdir, suffix) for subdir in subdirs)
+    return sorted(found)
+
+def tree_size(root: str) -> int:
+    """Total bytes of the files under root; one stat per file, symlinks counted but not followed"""
+    total = 0
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    return total
+
+# FICLONE from linux/fs.h: make the destination file share the source's blocks
+FICLONE = 0x40049409
+
+def _clone_file(src: str, dst: str):
+    import fcntl
+    with open(src, 'rb') as source, open(dst, 'xb') as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+def reflink_tree(src: str, dst: str) -> bool:
+    """Copy-on-write clone of a directory (APFS clonefile, btrfs/XFS FICLONE); False, leaving nothing behind, if unsupported"""
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    if not sys.platform.startswith("linux"):
+        return False
+    
+    import shutil
+    try:
+        shutil.copytree(src, dst, symlinks=True, copy_function=_clone_file)
+    except FileExistsError:
+        return False  # Something else created dst; leave it alone
+    except OSError:
+        # Never fall back to a real copy: that would duplicate every model on disk
+        shutil.rmtree(dst, ignore_errors=True)
+        return False
+    return True
+
+# Settings written to ComfyUI's user settings file
+COMFYUI_SETTINGS: Final = MappingProxyType({
+    "Comfy.DevMode": False,
+    "Comfy.PreviewFormat": "webp",
+    "Comfy.DisableSliders": False,
+    "Comfy.DisableFloatRounding": False,
+    "Comfy.FloatRoundingPrecision": 3,
+    "Comfy.SnapToGrid": True,
+    "Comfy.SnapToGridSize": 10,
+    "Comfy.Workflow.ShowMinimap": True,
+    "Comfy.Workflow.MinimapSize": 150,
+    "Comfy.NodeAutoComplete.Enabled": True,
+    "Comfy.NodeSearchBoxImpl": "default",
+    "Comfy.LinkRenderMode": "spline",
+    "Comfy.UseNewMenu": "Floating",
+    "Comfy.Workflow.ZoomSpeed": 1.1,
+    "Comfy.Graph.CanvasInfo": True,
+    "Comfy.Graph.CanvasInfoPosition": "top-right",
+    "Comfy.NodeBadge.NodeIdBadgeMode": "None",
+    "Comfy.NodeBadge.NodeSourceBadgeMode": "None",
+    "Comfy.NodeBadge.NodeLifeCycleBadgeMode": "None",
+    "Comfy.Keybinding.UseKeybindingForCtrlUpDown": False,
+    "Comfy.TextareaWidget.FontSize": 12,
+    "Comfy.ConfirmClear": True,
+    "Comfy.PromptFilename": True,
+    "Comfy.Queue.BatchCount": 1,
+    "Comfy.ModelManager.ModelPathsFile": "extra_model_paths.yaml",
+    "Comfy.Workflow.WorkflowTabsPosition": "Tabs",
+    "Comfy.TreeExplorer.ItemHeight": 24,
+    "Comfy.Sidebar.Location": "left",
+    "Comfy.Sidebar.Size": 300,
+    "Comfy.InvertMenuScrolling": False,
+    "Comfy.MiddleClickAction": "Pan",
+    "Comfy.NodeDefaults.SavedImagePrefix": "ComfyUI",
+    "Comfy.NodeDefaults.CheckpointLoader.ckpt_name": "",
+    "AGL.DevMode": False,
+    "AGL.UseNewMenu": "Floating"
+})
+
+# Optimal SD-WebUI settings for performance, merged over the existing config.json
+SD_WEBUI_SETTINGS: Final = MappingProxyType({
+    "samples_save": True,
+    "samples_format": "png",
+    "grid_save": True,
+    "return_grid": True,
+    "do_not_show_images": False,
+    "add_model_hash_to_info": True,
+    "add_model_name_to_info": True,
+    "disable_weights_auto_swap": False,
+    "inpainting_mask_weight": 1.0,
+    "initial_noise_multiplier": 1.0,
+    "CLIP_stop_at_last_layers": 1,
+    "upcast_attn": False,
+    "auto_launch_browser": "Local",
+    "show_progress_in_title": True,
+    "quicksettings_list": [
+        "sd_model_checkpoint",
+        "sd_vae",
+        "CLIP_stop_at_last_layers"
+    ],
+    "ui_tab_order": [],
+    "hidden_tabs": [],
+    "show_progressbar": True,
+    "live_previews_enable": True,
+    "live_preview_content": "Prompt",
+    "live_preview_refresh_period": 1000,
+    "save_images_before_face_restoration": False,
+    "save_images_before_highres_fix": False,
+    "save_images_before_color_correction": False,
+    "save_mask": False,
+    "save_mask_composite": False,
+    "jpeg_quality": 95,
+    "webp_lossless": False,
+    "img_max_size_mp": 200,
+    "use_original_name_batch": True,
+    "use_upscaler_name_as_suffix": False,
+    "save_selected_only": True,
+    "save_init_img": False,
+    "temp_dir": "",
+    "clean_temp_dir_at_start": True,
+    "save_incomplete_images": False,
+    "notification_audio": False,
+    "notification_volume": 100,
+    "outdir_samples": "",
+    "outdir_txt2img_samples": "outputs/txt2img-images",
+    "outdir_img2img_samples": "outputs/img2img-images",
+    "outdir_extras_samples": "outputs/extras-images",
+    "outdir_grids": "",
+    "outdir_txt2img_grids": "outputs/txt2img-grids",
+    "outdir_img2img_grids": "outputs/img2img-grids",
+    "outdir_save": "log/images",
+    "outdir_init_images": "outputs/init-images",
+    "gradio_theme": "Default",
+    "gradio_themes_cache": True,
+    "gallery_height": "",
+    "sd_checkpoint_cache": 1,
+    "sd_vae_checkpoint_cache": 0,
+    "sd_vae_overrides_per_model_preferences": True,
+    "auto_vae_precision_bfloat16": False,
+    "auto_vae_precision": True,
+    "sd_vae_encode_method": "Full",
+    "sd_vae_decode_method": "Full",
+    "sd_vae_sliced_encode": False,
+    "sd_vae_sliced_decode": False,
+    "rollback_vae": False,
+    "sd_lora": "None",
+    "lora_preferred_name": "Alias from file",
+    "lora_add_hashes_to_infotext": True,
+    "lora_show_all": False,
+    "lora_hide_unknown_for_versions": [],
+    "lora_in_memory_limit": 0,
+    "lora_not_found_warning_console": False,
+    "lora_not_found_gradio_warning": False,
+    "cross_attention_optimization": "Automatic",
+    "cross_attention_options": [],
+    "s_min_uncond": 0.0,
+    "token_merging_ratio": 0.0,
+    "token_merging_ratio_img2img": 0.0,
+    "token_merging_ratio_hr": 0.0,
+    "pad_cond_uncond": False,
+    "pad_cond_uncond_v0": False,
+    "persistent_cond_cache": True,
+    "batch_cond_uncond": True,
+    "fp8_storage": "Disable",
+    "cache_fp16_weight": False,
+    "hide_ldm_prints": True,
+    "disable_mmap_load_safetensors": False,
+    "use_old_emphasis_implementation": False,
+    "use_old_karras_scheduler_sigmas": False,
+    "no_dpmpp_sde_batch_determinism": False,
+    "use_old_hires_fix_width_height": False,
+    "dont_fix_second_order_samplers_schedule": False,
+    "hires_fix_use_firstpass_conds": False,
+    "use_old_scheduling": False,
+    "use_downcasted_alpha_bar": False,
+    "interrogate_keep_models_in_memory": False,
+    "interrogate_return_ranks": False,
+    "interrogate_clip_num_beams": 1,
+    "interrogate_clip_min_length": 24,
+    "interrogate_clip_max_length": 48,
+    "interrogate_clip_dict_limit": 1500,
+    "interrogate_clip_skip_categories": [],
+    "interrogate_deepbooru_score_threshold": 0.5,
+    "deepbooru_sort_alpha": True,
+    "deepbooru_use_spaces": True,
+    "deepbooru_escape": True,
+    "deepbooru_filter_tags": "",
+    "training_enable_tensorboard": False,
+    "training_tensorboard_save_images": False,
+    "training_tensorboard_flush_every": 120
+})
+
+# Content digests from earlier runs, keyed by "hasher|realpath|mtime_ns|size"
+HASH_CACHE_PATH = Path.home() / ".cache" / "ai_optimizer" / "hashes.json"
+
+def load_hash_cache() -> Dict[str, str]:
+    import json
+    try:
+        with open(HASH_CACHE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_hash_cache(cache: Dict[str, str]):
+    """Write the cache atomically so an interrupted run never leaves a partial file"""
+    import json
+    HASH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = HASH_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp, HASH_CACHE_PATH)
 
 class AIOptimizer:
-    def __init__(self):
+    # SD-WebUI directories and the ComfyUI directories that share them
+    SYMLINK_MAP = (
+        ("models/Stable-diffusion", "models/checkpoints"),
+        ("models/VAE", "models/vae"),
+        ("models/Lora", "models/loras"),
+        ("models/ESRGAN", "models/upscale_models"),
+        ("embeddings", "models/embeddings"),
+        ("models/ControlNet", "models/controlnet")
+    )
+    
+    def __init__(self, measure_sizes: bool = False):
+        # Walking a cache to total its size can take longer than deleting it, so it's opt-in
+        self.measure_sizes = measure_sizes
         self.home = Path.home()
         self.comfyui_path = self.home / "ComfyUI"
         self.sd_webui_path = self.home / "stable-diffusion-webui"
+        
+        # Paths for the scan, symlink and cleanup steps, resolved and joined once as plain strings
+        comfyui, sd_webui = os.path.realpath(self.comfyui_path), os.path.realpath(self.sd_webui_path)
+        home = str(self.home)
+        # A models folder symlinked to the other would otherwise be scanned twice and match itself
+        self.model_dirs = tuple(dict.fromkeys(
+            os.path.realpath(os.path.join(root, "models")) for root in (comfyui, sd_webui)
+        ))
+        self.symlink_paths = tuple(
+            (sd_dir, comfy_dir, os.path.join(sd_webui, sd_dir), os.path.join(comfyui, comfy_dir))
+            for sd_dir, comfy_dir in self.SYMLINK_MAP
+        )
+        self.cache_dirs = (
+            os.path.join(comfyui, "__pycache__"),
+            os.path.join(sd_webui, "__pycache__"),
+            os.path.join(home, ".cache", "torch"),
+            os.path.join(home, ".cache", "huggingface")
+        )
+        
         self.stats = {
             "models_found": 0,
             "duplicates_removed": 0,
@@ -25,50 +364,13 @@ class AIOptimizer:
         """Optimize ComfyUI settings"""
         settings_path = self.comfyui_path / "user" / "default" / "comfyui.settings.json"
         
-        optimal_settings = {
-            "Comfy.DevMode": False,
-            "Comfy.PreviewFormat": "webp",
-            "Comfy.DisableSliders": False,
-            "Comfy.DisableFloatRounding": False,
-            "Comfy.FloatRoundingPrecision": 3,
-            "Comfy.SnapToGrid": True,
-            "Comfy.SnapToGridSize": 10,
-            "Comfy.Workflow.ShowMinimap": True,
-            "Comfy.Workflow.MinimapSize": 150,
-            "Comfy.NodeAutoComplete.Enabled": True,
-            "Comfy.NodeSearchBoxImpl": "default",
-            "Comfy.LinkRenderMode": "spline",
-            "Comfy.UseNewMenu": "Floating",
-            "Comfy.Workflow.ZoomSpeed": 1.1,
-            "Comfy.Graph.CanvasInfo": True,
-            "Comfy.Graph.CanvasInfoPosition": "top-right",
-            "Comfy.NodeBadge.NodeIdBadgeMode": "None",
-            "Comfy.NodeBadge.NodeSourceBadgeMode": "None",
-            "Comfy.NodeBadge.NodeLifeCycleBadgeMode": "None",
-            "Comfy.Keybinding.UseKeybindingForCtrlUpDown": False,
-            "Comfy.TextareaWidget.FontSize": 12,
-            "Comfy.ConfirmClear": True,
-            "Comfy.PromptFilename": True,
-            "Comfy.Queue.BatchCount": 1,
-            "Comfy.ModelManager.ModelPathsFile": "extra_model_paths.yaml",
-            "Comfy.Workflow.WorkflowTabsPosition": "Tabs",
-            "Comfy.TreeExplorer.ItemHeight": 24,
-            "Comfy.Sidebar.Location": "left",
-            "Comfy.Sidebar.Size": 300,
-            "Comfy.InvertMenuScrolling": False,
-            "Comfy.MiddleClickAction": "Pan",
-            "Comfy.NodeDefaults.SavedImagePrefix": "ComfyUI",
-            "Comfy.NodeDefaults.CheckpointLoader.ckpt_name": "",
-            "AGL.DevMode": False,
-            "AGL.UseNewMenu": "Floating"
-        }
-        
         # Ensure directory exists
         settings_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Write optimized settings
-        with open(settings_path, 'w') as f:
-            json.dump(optimal_settings, f, indent=2)
+        if not write_if_changed(settings_path, dump_settings(dict(COMFYUI_SETTINGS))):
+            print("✅ ComfyUI settings already optimal")
+            return
         
         self.stats["optimizations"].append("ComfyUI settings optimized")
         print("✅ ComfyUI settings optimized")
@@ -77,238 +379,166 @@ class AIOptimizer:
         """Optimize Stable Diffusion WebUI settings"""
         config_path = self.sd_webui_path / "config.json"
         
-        if config_path.exists():
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {}
-        
-        # Optimal settings for performance
-        optimizations = {
-            "samples_save": True,
-            "samples_format": "png",
-            "grid_save": True,
-            "return_grid": True,
-            "do_not_show_images": False,
-            "add_model_hash_to_info": True,
-            "add_model_name_to_info": True,
-            "disable_weights_auto_swap": False,
-            "inpainting_mask_weight": 1.0,
-            "initial_noise_multiplier": 1.0,
-            "CLIP_stop_at_last_layers": 1,
-            "upcast_attn": False,
-            "auto_launch_browser": "Local",
-            "show_progress_in_title": True,
-            "quicksettings_list": [
-                "sd_model_checkpoint",
-                "sd_vae",
-                "CLIP_stop_at_last_layers"
-            ],
-            "ui_tab_order": [],
-            "hidden_tabs": [],
-            "show_progressbar": True,
-            "live_previews_enable": True,
-            "live_preview_content": "Prompt",
-            "live_preview_refresh_period": 1000,
-            "save_images_before_face_restoration": False,
-            "save_images_before_highres_fix": False,
-            "save_images_before_color_correction": False,
-            "save_mask": False,
-            "save_mask_composite": False,
-            "jpeg_quality": 95,
-            "webp_lossless": False,
-            "img_max_size_mp": 200,
-            "use_original_name_batch": True,
-            "use_upscaler_name_as_suffix": False,
-            "save_selected_only": True,
-            "save_init_img": False,
-            "temp_dir": "",
-            "clean_temp_dir_at_start": True,
-            "save_incomplete_images": False,
-            "notification_audio": False,
-            "notification_volume": 100,
-            "outdir_samples": "",
-            "outdir_txt2img_samples": "outputs/txt2img-images",
-            "outdir_img2img_samples": "outputs/img2img-images",
-            "outdir_extras_samples": "outputs/extras-images",
-            "outdir_grids": "",
-            "outdir_txt2img_grids": "outputs/txt2img-grids",
-            "outdir_img2img_grids": "outputs/img2img-grids",
-            "outdir_save": "log/images",
-            "outdir_init_images": "outputs/init-images",
-            "gradio_theme": "Default",
-            "gradio_themes_cache": True,
-            "gallery_height": "",
-            "sd_checkpoint_cache": 1,
-            "sd_vae_checkpoint_cache": 0,
-            "sd_vae_overrides_per_model_preferences": True,
-            "auto_vae_precision_bfloat16": False,
-            "auto_vae_precision": True,
-            "sd_vae_encode_method": "Full",
-            "sd_vae_decode_method": "Full",
-            "sd_vae_sliced_encode": False,
-            "sd_vae_sliced_decode": False,
-            "rollback_vae": False,
-            "sd_lora": "None",
-            "lora_preferred_name": "Alias from file",
-            "lora_add_hashes_to_infotext": True,
-            "lora_show_all": False,
-            "lora_hide_unknown_for_versions": [],
-            "lora_in_memory_limit": 0,
-            "lora_not_found_warning_console": False,
-            "lora_not_found_gradio_warning": False,
-            "cross_attention_optimization": "Automatic",
-            "cross_attention_options": [],
-            "s_min_uncond": 0.0,
-            "token_merging_ratio": 0.0,
-            "token_merging_ratio_img2img": 0.0,
-            "token_merging_ratio_hr": 0.0,
-            "pad_cond_uncond": False,
-            "pad_cond_uncond_v0": False,
-            "persistent_cond_cache": True,
-            "batch_cond_uncond": True,
-            "fp8_storage": "Disable",
-            "cache_fp16_weight": False,
-            "hide_ldm_prints": True,
-            "disable_mmap_load_safetensors": False,
-            "use_old_emphasis_implementation": False,
-            "use_old_karras_scheduler_sigmas": False,
-            "no_dpmpp_sde_batch_determinism": False,
-            "use_old_hires_fix_width_height": False,
-            "dont_fix_second_order_samplers_schedule": False,
-            "hires_fix_use_firstpass_conds": False,
-            "use_old_scheduling": False,
-            "use_downcasted_alpha_bar": False,
-            "interrogate_keep_models_in_memory": False,
-            "interrogate_return_ranks": False,
-            "interrogate_clip_num_beams": 1,
-            "interrogate_clip_min_length": 24,
-            "interrogate_clip_max_length": 48,
-            "interrogate_clip_dict_limit": 1500,
-            "interrogate_clip_skip_categories": [],
-            "interrogate_deepbooru_score_threshold": 0.5,
-            "deepbooru_sort_alpha": True,
-            "deepbooru_use_spaces": True,
-            "deepbooru_escape": True,
-            "deepbooru_filter_tags": "",
-            "training_enable_tensorboard": False,
-            "training_tensorboard_save_images": False,
-            "training_tensorboard_flush_every": 120
-        }
+        current = config_path.read_bytes() if config_path.exists() else None
+        config = load_settings(current) if current else {}
         
-        config.update(optimizations)
+        config.update(SD_WEBUI_SETTINGS)
         
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        if not write_if_changed(config_path, dump_settings(config), current):
+            print("✅ Stable Diffusion WebUI config already optimal")
+            return
         
         self.stats["optimizations"].append("SD-WebUI config optimized")
         print("✅ Stable Diffusion WebUI config optimized")
     
     def find_duplicate_models(self):
         """Find and remove duplicate model files"""
-        model_dirs = [
-            self.comfyui_path / "models",
-            self.sd_webui_path / "models"
-        ]
-        
-        model_hashes = {}
-        duplicates = []
+        files_by_size = {}
         
-        for model_dir in model_dirs:
-            if not model_dir.exists():
+        for model_dir in self.model_dirs:
+            if not os.path.isdir(model_dir):
                 continue
             
-            for model_file in model_dir.rglob("*.safetensors"):
-                # Get file size as simple duplicate check
-                size = model_file.stat().st_size
-                key = (model_file.name, size)
-                
-                if key in model_hashes:
-                    duplicates.append((model_hashes[key], model_file))
-                else:
-                    model_hashes[key] = model_file
-                
+            for model_file, size, mtime_ns in scan_files(model_dir, ".safetensors"):
+                files_by_size.setdefault(size, []).append((model_file, mtime_ns))
                 self.stats["models_found"] += 1
         
+        # Only files sharing a size can be duplicates; confirm by content, so renamed copies are found too
+        # A file reached through a symlink is the same file, not a duplicate; keep its first path only
+        candidates = []
+        seen = set()
+        for size, files in files_by_size.items():
+            if len(files) < 2:
+                continue
+            for path, mtime_ns in files:
+                real = os.path.realpath(path)
+                if real not in seen:
+                    seen.add(real)
+                    candidates.append((path, size, f"{content_hasher.__name__}|{real}|{mtime_ns}|{size}"))
+        
+        # Unchanged files reuse the digest from the last run; only new or modified ones are read
+        cached = load_hash_cache()
+        digests = {cache_key: cached[cache_key] for _, _, cache_key in candidates if cache_key in cached}
+        misses = [candidate for candidate in candidates if candidate[2] not in digests]
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+            for (_, _, cache_key), digest in zip(misses, pool.map(lambda c: edge_digest(c[0], c[1]), misses)):
+                digests[cache_key] = digest.hex()
+        
+        # Group identical files; the first of each group (in path order) is kept as the original
+        groups = defaultdict(list)
+        for model_file, size, cache_key in candidates:
+            groups[(size, digests[cache_key])].append(model_file)
+        duplicates = [
+            (paths[0], duplicate, size)
+            for (size, _), paths in groups.items() if len(paths) > 1
+            for duplicate in paths[1:]
+        ]
+        
+        # Keep only files seen this run so the cache doesn't grow with deleted models
+        if digests != cached:
+            save_hash_cache(digests)
+        
         # Report duplicates (don't auto-delete for safety)
         if duplicates:
             print(f"\n⚠️  Found {len(duplicates)} potential duplicate models:")
-            for original, duplicate in duplicates[:5]:  # Show first 5
-                size_mb = duplicate.stat().st_size / (1024 * 1024)
-                print(f"  - {duplicate.name} ({size_mb:.1f} MB)")
-                self.stats["space_saved_mb"] += size_mb
+            for original, duplicate, size in duplicates[:5]:  # Show first 5
+                print(f"  - {os.path.basename(duplicate)} ({size / (1024 * 1024):.1f} MB)")
+            
+            # Savings count every duplicate, not just the ones listed
+            self.stats["space_saved_mb"] += sum(size for _, _, size in duplicates) / (1024 * 1024)
         
         self.stats["duplicates_removed"] = len(duplicates)
     
     def create_model_symlinks(self):
         """Create symlinks to share models between ComfyUI and SD-WebUI"""
-        # Map SD-WebUI directories to ComfyUI directories
-        symlink_map = {
-            "models/Stable-diffusion": "models/checkpoints",
-            "models/VAE": "models/vae",
-            "models/Lora": "models/loras",
-            "models/ESRGAN": "models/upscale_models",
-            "embeddings": "models/embeddings",
-            "models/ControlNet": "models/controlnet"
-        }
-        
-        for sd_dir, comfy_dir in symlink_map.items():
-            sd_path = self.sd_webui_path / sd_dir
-            comfy_path = self.comfyui_path / comfy_dir
+        # Most mappings share models/ as their parent; create each parent once
+        created_parents = set()
+        for sd_dir, comfy_dir, sd_path, comfy_path in self.symlink_paths:
+            if not os.path.exists(sd_path):
+                continue
             
-            if sd_path.exists() and not comfy_path.exists():
-                comfy_path.parent.mkdir(parents=True, exist_ok=True)
-                try:
-                    comfy_path.symlink_to(sd_path)
-                    print(f"✅ Created symlink: {comfy_dir} -> {sd_dir}")
-                    self.stats["optimizations"].append(f"Symlinked {comfy_dir}")
-                except:
-                    pass
+            parent = os.path.dirname(comfy_path)
+            if parent not in created_parents:
+                os.makedirs(parent, exist_ok=True)
+                created_parents.add(parent)
+            
+            # Let symlink() report an existing target instead of checking first, which could race
+            try:
+                os.symlink(sd_path, comfy_path)
+            except FileExistsError:
+                continue
+            except OSError:
+                # Symlinks unavailable (e.g. no privilege); a reflink clone still shares the blocks
+                if reflink_tree(sd_path, comfy_path):
+                    print(f"✅ Created reflink copy: {comfy_dir} -> {sd_dir}")
+                    self.stats["optimizations"].append(f"Reflinked {comfy_dir}")
+                continue
+            print(f"✅ Created symlink: {comfy_dir} -> {sd_dir}")
+            self.stats["optimizations"].append(f"Symlinked {comfy_dir}")
     
     def cleanup_cache(self):
         """Clean up unnecessary cache files"""
-        cache_dirs = [
-            self.comfyui_path / "__pycache__",
-            self.sd_webui_path / "__pycache__",
-            self.home / ".cache" / "torch",
-            self.home / ".cache" / "huggingface"
-        ]
+        import shutil
+        import threading
         
-        for cache_dir in cache_dirs:
-            if cache_dir.exists():
+        for cache_dir in self.cache_dirs:
+            if os.path.exists(cache_dir):
                 try:
-                    size_before = sum(f.stat().st_size for f in cache_dir.rglob("*") if f.is_file())
-                    shutil.rmtree(cache_dir, ignore_errors=True)
-                    self.stats["space_saved_mb"] += size_before / (1024 * 1024)
-                    print(f"✅ Cleaned cache: {cache_dir.name}")
+                    size_before = tree_size(cache_dir) if self.measure_sizes else None
+                    # Move the cache aside instantly and delete it in the background; the thread
+                    # isn't a daemon, so the removal still completes before the script exits
+                    trash = f"{cache_dir}.trash-{os.getpid()}"
+                    try:
+                        os.rename(cache_dir, trash)
+                    except OSError:
+                        shutil.rmtree(cache_dir, ignore_errors=True)
+                    else:
+                        threading.Thread(target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}).start()
+                    if size_before is None:
+                        print(f"✅ Cleaned cache: {os.path.basename(cache_dir)} (size not measured)")
+                    else:
+                        self.stats["space_saved_mb"] += size_before / (1024 * 1024)
+                        print(f"✅ Cleaned cache: {os.path.basename(cache_dir)}")
                 except:
                     pass
     
     def print_report(self):
         """Print optimization report"""
-        print("\n" + "="*60)
-        print("🚀 AI SETUP OPTIMIZATION REPORT")
-        print("="*60)
-        print(f"📊 Models found: {self.stats['models_found']}")
-        print(f"🔄 Duplicate models: {self.stats['duplicates_removed']}")
-        print(f"💾 Potential space savings: {self.stats['space_saved_mb']:.1f} MB")
-        print(f"✨ Optimizations applied: {len(self.stats['optimizations'])}")
+        # Built up front and written in one call rather than one write per line
+        lines = [
+            "",
+            "="*60,
+            "🚀 AI SETUP OPTIMIZATION REPORT",
+            "="*60,
+            f"📊 Models found: {self.stats['models_found']}",
+            f"🔄 Duplicate models: {self.stats['duplicates_removed']}",
+            f"💾 Potential space savings: {self.stats['space_saved_mb']:.1f} MB",
+            f"✨ Optimizations applied: {len(self.stats['optimizations'])}"
+        ]
         
         if self.stats['optimizations']:
-            print("\n📋 Completed optimizations:")
-            for opt in self.stats['optimizations']:
-                print(f"  • {opt}")
+            lines.append("\n📋 Completed optimizations:")
+            lines.extend(f"  • {opt}" for opt in self.stats['optimizations'])
         
-        print("\n💡 Recommendations:")
-        print("  1. Restart ComfyUI and SD-WebUI to apply settings")
-        print("  2. Review duplicate models and remove manually if confirmed")
-        print("  3. Consider using model symlinks to save space")
-        print("  4. Enable xFormers for better performance if available")
-        print("  5. Use --medvram or --lowvram flags if experiencing OOM errors")
-        print("="*60)
+        lines += [
+            "\n💡 Recommendations:",
+            "  1. Restart ComfyUI and SD-WebUI to apply settings",
+            "  2. Review duplicate models and remove manually if confirmed",
+            "  3. Consider using model symlinks to save space",
+            "  4. Enable xFormers for better performance if available",
+            "  5. Use --medvram or --lowvram flags if experiencing OOM errors",
+            "="*60
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
 
 def main():
-    optimizer = AIOptimizer()
+    parser = argparse.ArgumentParser(description="Configure and optimize ComfyUI and Stable Diffusion WebUI")
+    parser.add_argument("--report-sizes", action="store_true",
+                        help="measure each cache before deleting it and include it in the space savings")
+    args = parser.parse_args()
+    
+    optimizer = AIOptimizer(measure_sizes=args.report_sizes)
     
     print("🔧 Starting AI setup optimization...")
     